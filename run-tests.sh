@@ -15,4 +15,4 @@ set -o nounset
 
 python -m check_manifest
 python -m sphinx.cmd.build -qnNW docs docs/_build/html
-python -m pytest
+python -m pytest -n auto
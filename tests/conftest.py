@@ -8,21 +8,207 @@
 
 """Test fixture."""
 
-import shutil
-import tempfile
-from os.path import dirname, join
+import os
+from functools import lru_cache
+from os.path import dirname, join, relpath
+from types import SimpleNamespace
+from urllib.parse import urlparse
 
 import pytest
+from XRootD.client import FileSystem
+from XRootD.client.flags import OpenFlags
+from XRootD.client.responses import XRootDStatus
 
+_OK = {
+    "status": 0,
+    "code": 0,
+    "ok": True,
+    "errno": 0,
+    "error": False,
+    "message": "[SUCCESS] ",
+    "fatal": False,
+    "shellcode": 0,
+}
 
+
+def _status(**kwargs):
+    """Build an XRootDStatus, successful unless overridden."""
+    return XRootDStatus(dict(_OK, **kwargs))
+
+
+class LocalFile(object):
+    """Stand-in for ``XRootD.client.File`` operating on local files.
+
+    Only the calls made by ``XRootDPyFile`` are implemented. The tests run
+    against ``root://localhost/`` URLs pointing into a local temporary
+    directory, so the URL path can be used directly.
+    """
+
+    _oflags = {
+        OpenFlags.READ: os.O_RDONLY,
+        OpenFlags.UPDATE: os.O_RDWR,
+        OpenFlags.DELETE: os.O_RDWR | os.O_CREAT | os.O_TRUNC,
+    }
+
+    def __init__(self):
+        self._fd = None
+
+    def open(self, url, flags=0, mode=0, timeout=0, callback=None):
+        oflags = self._oflags.get(flags, os.O_RDONLY)
+        try:
+            self._fd = os.open(urlparse(url).path, oflags, 0o644)
+        except FileNotFoundError as e:
+            return _status(ok=False, error=True, errno=3011, message=str(e)), None
+        return _status(), None
+
+    def is_open(self):
+        return self._fd is not None
+
+    def close(self, timeout=0, callback=None):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if callback is not None:
+            callback(_status(), None, None)
+            return _status()
+        return _status(), None
+
+    def stat(self, force=False, timeout=0, callback=None):
+        return _status(), SimpleNamespace(size=os.fstat(self._fd).st_size)
+
+    def read(self, offset=0, size=0, timeout=0, callback=None):
+        if not size:
+            size = max(os.fstat(self._fd).st_size - offset, 0)
+        data = os.pread(self._fd, size, offset)
+        if callback is not None:
+            callback(_status(), data, None)
+            return _status()
+        return _status(), data
+
+    def vector_read(self, chunks, timeout=0, callback=None):
+        chunks = [
+            SimpleNamespace(offset=o, length=n, buffer=os.pread(self._fd, n, o))
+            for o, n in chunks
+        ]
+        return _status(), SimpleNamespace(chunks=chunks)
+
+    def write(self, buffer, offset=0, size=0, timeout=0, callback=None):
+        try:
+            os.pwrite(self._fd, buffer, offset)
+            status = _status()
+        except OSError as e:
+            status = _status(ok=False, error=True, errno=e.errno, message=str(e))
+        if callback is not None:
+            callback(status, None, None)
+            return status
+        return status, None
+
+    def truncate(self, size, timeout=0, callback=None):
+        try:
+            os.ftruncate(self._fd, size)
+        except OSError as e:
+            return _status(ok=False, error=True, errno=e.errno, message=str(e)), None
+        return _status(), None
+
+    def sync(self, timeout=0, callback=None):
+        return _status(), None
+
+
+class LocalFileSystem(object):
+    """Stand-in for ``XRootD.client.FileSystem`` used by ``XRootDPyFile``."""
+
+    def __init__(self, url):
+        self.url = url
+
+    def query(self, querycode, arg, timeout=0, callback=None):
+        return _status(), b"1024\n2097136\n"
+
+
+def pytest_addoption(parser):
+    """Add the ``--xrootd-local`` option."""
+    parser.addoption(
+        "--xrootd-local",
+        action="store_true",
+        default=False,
+        help="Run XRootDPyFile tests against local files instead of an "
+        "XRootD server. Tests marked 'xrootd_server' are skipped.",
+    )
+
+
+def pytest_configure(config):
+    """Register custom markers."""
+    config.addinivalue_line(
+        "markers", "xrootd_server: test needs a running XRootD server"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip server-only tests when running with ``--xrootd-local``."""
+    if not config.getoption("--xrootd-local"):
+        return
+    skip = pytest.mark.skip(reason="needs an XRootD server (--xrootd-local)")
+    for item in items:
+        if "xrootd_server" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def xrootd_local(request):
+    """Swap the XRootD file client for ``LocalFile`` if requested."""
+    if not request.config.getoption("--xrootd-local"):
+        yield False
+        return
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("xrootdpyfs.xrdfile.File", LocalFile)
+        mp.setattr("xrootdpyfs.xrdfile.FileSystem", LocalFileSystem)
+        yield True
+
+
+@lru_cache(maxsize=256)
 def mkurl(p):
-    """Generate test root URL."""
+    """Generate test root URL (memoized, paths repeat across a test)."""
     return "root://localhost/{0}".format(p)
 
 
+@pytest.fixture(scope="session")
+def datafiles():
+    """Contents of ``tests/data``, read once per session.
+
+    Returns a list of directories and a mapping of file paths to their
+    contents, both relative to ``tests/``.
+    """
+    root = dirname(__file__)
+    dirs, files = [], {}
+    for dirpath, dirnames, filenames in os.walk(join(root, "data")):
+        dirs.append(relpath(dirpath, root))
+        for fn in filenames:
+            with open(join(dirpath, fn), "rb") as f:
+                files[relpath(join(dirpath, fn), root)] = f.read()
+    return dirs, files
+
+
 @pytest.fixture
-def tmppath(request):
-    """Fixture data for XrootDPyFS."""
-    path = tempfile.mkdtemp()
-    shutil.copytree(join(dirname(__file__), "data"), join(path, "data"))
+def tmppath(tmp_path_factory, datafiles):
+    """Fixture data for XrootDPyFS.
+
+    Each test gets its own directory. When running under ``pytest-xdist`` the
+    directories are further separated per worker, so tests can be run in
+    parallel with ``pytest -n auto``.
+    """
+    path = str(tmp_path_factory.mktemp("xrootdpyfs"))
+    dirs, files = datafiles
+    for d in dirs:
+        os.makedirs(join(path, d), exist_ok=True)
+    for fn, data in files.items():
+        fd = os.open(join(path, fn), os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
     return path
+
+
+@pytest.fixture(scope="module")
+def xrd_client():
+    """XRootD filesystem client shared by all tests in a module."""
+    return FileSystem(mkurl(""))
@@ -30,11 +30,30 @@ from fs.errors import (
     Unsupported,
 )
 from mock import Mock
+from XRootD.client.flags import StatInfoFlags
 from XRootD.client.responses import XRootDStatus
 
 from xrootdpyfs import XRootDPyFile, XRootDPyFS
 from xrootdpyfs.utils import spliturl
 
+pytestmark = pytest.mark.xrootd_server
+
+_INVALID_ADDRESS_RESULT = (
+    XRootDStatus(
+        {
+            "status": 3,
+            "code": 101,
+            "ok": False,
+            "errno": 0,
+            "error": True,
+            "message": "[FATAL] Invalid address",
+            "fatal": True,
+            "shellcode": 51,
+        }
+    ),
+    None,
+)
+
 
 def test_init(tmppath):
     """Test initialization."""
@@ -83,6 +102,10 @@ def test_p():
     fs = XRootDPyFS("root://eosuser.cern.ch//eos/user/")
     assert fs._p("./") == "//eos/user"
     assert fs._p("l") == "//eos/user/l"
+    assert fs._p("l/m.txt") == "//eos/user/l/m.txt"
+    assert fs._p("l/") == "//eos/user/l"
+    assert fs._p("l/./m") == "//eos/user/l/m"
+    assert fs._p("") == "//eos/user"
     assert fs._p("/eos/user") == "//eos/user"
     assert fs._p("//eos/user") == "//eos/user"
     assert fs._p("/eos/user/folder") == "//eos/user/folder"
@@ -92,21 +115,15 @@ def test_p():
     assert fs._p("../project/../test") == "//eos/test"
     pytest.raises(IllegalBackReference, fs._p, "../../../test")
 
+    fs = XRootDPyFS("root://eosuser.cern.ch//")
+    assert fs._p("l/m.txt") == "//l/m.txt"
+    assert fs._p("/l") == "//l"
+
 
 def test_query_error(tmppath):
     """Test unknown error from query."""
     fs = XRootDPyFS(mkurl(tmppath))
-    fake_status = {
-        "status": 3,
-        "code": 101,
-        "ok": False,
-        "errno": 0,
-        "error": True,
-        "message": "[FATAL] Invalid address",
-        "fatal": True,
-        "shellcode": 51,
-    }
-    fs.xrd_client.query = Mock(return_value=(XRootDStatus(fake_status), None))
+    fs.xrd_client.query = Mock(return_value=_INVALID_ADDRESS_RESULT)
     pytest.raises(FSError, fs._query, 3, "data/testa.txt")
 
 
@@ -116,6 +133,80 @@ def test_ilistdir(tmppath):
     assert isinstance(XRootDPyFS(rooturl).ilistdir(), types.GeneratorType)
 
 
+def test_ilistdir_many(tmppath):
+    """Test listing several directories at once."""
+    xfs = XRootDPyFS(mkurl(tmppath))
+    paths = ["data", "data/afolder", "data/bfolder"]
+
+    listings = {path: list(entries) for path, entries in xfs.ilistdir_many(paths)}
+    assert sorted(listings) == paths
+    for path in paths:
+        assert sorted(listings[path]) == sorted(xfs.listdir(path))
+
+    listings = dict(xfs.ilistdir_many(["data"], dirs_only=True, full=True))
+    assert sorted(listings["data"]) == sorted(
+        xfs.listdir("data", dirs_only=True, full=True)
+    )
+
+    with pytest.raises(ResourceNotFound):
+        list(xfs.ilistdir_many(["data", "nope"]))
+    with pytest.raises(ValueError):
+        list(xfs.ilistdir_many(paths, dirs_only=True, files_only=True))
+
+
+def test_walkfiles_bulk(tmppath):
+    """Test walking a tree with pipelined directory listings."""
+    xfs = XRootDPyFS(mkurl(tmppath))
+    expected = sorted(
+        os.path.relpath(join(root, name), tmppath)
+        for root, _, files in os.walk(join(tmppath, "data"))
+        for name in files
+    )
+    assert "data/afolder/afile.txt" in expected
+
+    assert sorted(xfs.walkfiles_bulk("data")) == expected
+    assert sorted(xfs.walkfiles_bulk()) == expected
+    assert list(xfs.walkfiles_bulk("data/afolder")) == ["data/afolder/afile.txt"]
+
+    with pytest.raises(ResourceNotFound):
+        list(xfs.walkfiles_bulk("nope"))
+
+
+def test_bulk_stat(tmppath):
+    """Test stat'ing several paths at once."""
+    xfs = XRootDPyFS(mkurl(tmppath), stat_cache_ttl=60)
+    paths = ["data/testa.txt", "data/afolder", "data/multiline.txt"]
+
+    stats = xfs.bulk_stat(paths)
+    assert [s.size for s in stats[::2]] == [
+        os.path.getsize(join(tmppath, p)) for p in paths[::2]
+    ]
+    assert stats[1].flags & StatInfoFlags.IS_DIR
+
+    # The results are cached.
+    xfs.xrd_client.stat = Mock(wraps=xfs.xrd_client.stat)
+    assert xfs.isdir("data/afolder") and xfs.isfile("data/testa.txt")
+    assert xfs.xrd_client.stat.call_count == 0
+
+    with pytest.raises(ResourceNotFound):
+        xfs.bulk_stat(["data/testa.txt", "nope"])
+    assert xfs.bulk_stat([]) == []
+
+
+def test_bulk_remove(tmppath):
+    """Test removing several files at once."""
+    xfs = XRootDPyFS(mkurl(tmppath))
+    paths = ["data/testa.txt", "data/afolder/afile.txt"]
+
+    assert xfs.bulk_remove(paths)
+    assert not any(exists(join(tmppath, p)) for p in paths)
+
+    # All paths are tried before the first error is raised.
+    with pytest.raises(ResourceNotFound):
+        xfs.bulk_remove(["data/testa.txt", "data/multiline.txt"])
+    assert not exists(join(tmppath, "data/multiline.txt"))
+
+
 def test_listdir(tmppath):
     """Test listdir."""
     rooturl = mkurl(tmppath)
@@ -263,19 +354,7 @@ def test_remove_dir_mock1(tmppath):
     """Test removedir."""
     fs = XRootDPyFS(mkurl(tmppath))
 
-    status = XRootDStatus(
-        {
-            "status": 3,
-            "code": 101,
-            "ok": False,
-            "errno": 0,
-            "error": True,
-            "message": "[FATAL] Invalid address",
-            "fatal": True,
-            "shellcode": 51,
-        }
-    )
-    fs.xrd_client.rm = Mock(return_value=(status, None))
+    fs.xrd_client.rm = Mock(return_value=_INVALID_ADDRESS_RESULT)
     pytest.raises(ResourceError, fs.removedir, "data/bfolder/", force=True)
 
 
@@ -283,24 +362,11 @@ def test_remove_dir_mock2(tmppath):
     """Test removedir."""
     fs = XRootDPyFS(mkurl(tmppath))
 
-    status = XRootDStatus(
-        {
-            "status": 3,
-            "code": 101,
-            "ok": False,
-            "errno": 0,
-            "error": True,
-            "message": "[FATAL] Invalid address",
-            "fatal": True,
-            "shellcode": 51,
-        }
-    )
-
     def fail(f, fail_on):
         @wraps(f)
         def inner(path, **kwargs):
             if path == fail_on:
-                return (status, None)
+                return _INVALID_ADDRESS_RESULT
             return f(path, **kwargs)
 
         return inner
@@ -431,17 +497,7 @@ def test_ping(tmppath):
     """Test ping method."""
     fs = XRootDPyFS(mkurl(tmppath))
     assert fs.xrd_ping()
-    fake_status = {
-        "status": 3,
-        "code": 101,
-        "ok": False,
-        "errno": 0,
-        "error": True,
-        "message": "[FATAL] Invalid address",
-        "fatal": True,
-        "shellcode": 51,
-    }
-    fs.xrd_client.ping = Mock(return_value=(XRootDStatus(fake_status), None))
+    fs.xrd_client.ping = Mock(return_value=_INVALID_ADDRESS_RESULT)
     pytest.raises(RemoteConnectionError, fs.xrd_ping)
 
 
@@ -807,3 +863,38 @@ def test_openbin():
 def test_setinfo():
     """Test setinfo."""
     pytest.raises(NotImplementedError)
+
+
+def test_stat_cache(tmppath):
+    """Test reuse and invalidation of cached stat results."""
+    fs = XRootDPyFS(mkurl(tmppath), stat_cache_ttl=60)
+    fs.xrd_client.stat = Mock(wraps=fs.xrd_client.stat)
+
+    assert fs.getinfo("data/testa.txt", ["details"]).size == 10
+    assert fs.getinfo("data/testa.txt", ["details"]).size == 10
+    assert fs.xrd_client.stat.call_count == 1
+
+    # Opening for writing drops the entry.
+    with fs.open("data/testa.txt", "w") as f:
+        f.write(b"abc")
+    assert fs.getinfo("data/testa.txt", ["details"]).size == 3
+    assert fs.xrd_client.stat.call_count == 2
+
+    # isdir(), isfile() and exists() share the cached result.
+    assert fs.isfile("data/testa.txt")
+    assert not fs.isdir("data/testa.txt")
+    assert fs.exists("data/testa.txt")
+    assert fs.xrd_client.stat.call_count == 2
+
+    fs.remove("data/testa.txt")
+    pytest.raises(ResourceNotFound, fs.getinfo, "data/testa.txt")
+    assert not fs.exists("data/testa.txt")
+    assert not fs.isfile("data/testa.txt")
+
+    # A TTL of zero disables the cache.
+    fs = XRootDPyFS(mkurl(tmppath))
+    fs.xrd_client.stat = Mock(wraps=fs.xrd_client.stat)
+    fs.getinfo("data/multiline.txt")
+    fs.getinfo("data/multiline.txt")
+    assert fs.xrd_client.stat.call_count == 2
+    assert not fs._stat_cache
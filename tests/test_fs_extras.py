@@ -14,6 +14,8 @@ from fs.errors import ResourceNotFound
 
 from xrootdpyfs import XRootDPyFS
 
+pytestmark = pytest.mark.xrootd_server
+
 
 def test_readtext(tmppath):
     """Test readtext."""
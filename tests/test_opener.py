@@ -8,9 +8,12 @@
 
 """Test of XRootDPyOpener."""
 
+import pytest
 from conftest import mkurl
 from fs.opener import open_fs
 
+pytestmark = pytest.mark.xrootd_server
+
 
 def test_open_fs_create(tmppath):
     """Test open with create."""
@@ -33,6 +33,16 @@ def test_spliturl():
     assert path == "//"
     assert arg == ""
 
+    root, path, arg = spliturl("roots://user@localhost:1094")
+    assert root == "roots://user@localhost:1094"
+    assert path == ""
+    assert arg == ""
+
+    root, path, arg = spliturl("root://localhost//eos;a#frag")
+    assert root == "root://localhost"
+    assert path == "//eos;a"
+    assert arg == ""
+
 
 def test_is_valid_path():
     """Test is valid path."""
@@ -9,24 +9,61 @@
 """Test of XRootDPyFS."""
 
 import errno
-import math
-from os.path import join
+import gc
+import hashlib
+import io
+import os
+import shutil
+import weakref
+from functools import lru_cache
+from itertools import islice
+from os.path import dirname, exists, join
+from pathlib import Path
+from types import MappingProxyType
 
 import fs.path
 import pytest
 from conftest import mkurl
 from fs import Seek
 from fs.errors import InvalidPath, PathError, ResourceNotFound, Unsupported
-from fs.opener import open_fs
-from mock import Mock
+from mock import Mock, call
 from XRootD.client.responses import XRootDStatus
 
-from xrootdpyfs import XRootDPyFile
-from xrootdpyfs.utils import is_valid_path, is_valid_url
+from xrootdpyfs import XRootDPyFile, xrdfile
+from xrootdpyfs.utils import is_valid_path, is_valid_url, spliturl
+from xrootdpyfs.xrdfile import _server_limits, wait_for_pending_closes
+
+_FAKE_STATUS = MappingProxyType(
+    {
+        "status": 3,
+        "code": 0,
+        "ok": False,
+        "errno": errno.EREMOTE,
+        "error": True,
+        "message": "[FATAL] Remote I/O Error",
+        "fatal": True,
+        "shellcode": 51,
+    }
+)
+_FAKE_ERROR = XRootDStatus(dict(_FAKE_STATUS))
+_FAKE_ERROR_RESULT = (_FAKE_ERROR, None)
+
+
+def _fake_error(*args, **kwargs):
+    """Stand-in for an XRootD client call which always fails."""
+    return _FAKE_ERROR_RESULT
 
 
-def _list_str_encode(_list):
-    return [el.encode() for el in _list]
+def _drain(xfile):
+    """Read ``xfile`` to its end into a reused buffer; return the byte count."""
+    buf = bytearray(64 * 1024)
+    readinto = xfile.readinto
+    total = 0
+    n = readinto(buf)
+    while n:
+        total += n
+        n = readinto(buf)
+    return total
 
 
 def test_init_basic(tmppath):
@@ -34,7 +71,7 @@ def test_init_basic(tmppath):
 
     fname = "testa.txt"
     fpath = "data/"
-    fcontents = "testa.txt\n"
+    fcontents = b"testa.txt\n"
     full_fpath = join(tmppath, fpath, fname)
     xfile = XRootDPyFile(mkurl(full_fpath))
     assert xfile
@@ -44,21 +81,19 @@ def test_init_basic(tmppath):
 
     # Verify that underlying/wrapped file can be read.
     statmsg, res = xfile._file.read()
-    assert res == fcontents.encode()
+    assert res == fcontents
 
 
 def test_init_writemode_basic(tmppath):
     # Non-existing file is created.
-    fn, fp, fc = "nope", "data/", ""
+    fn, fp, fc = "nope", "data/", b""
     full_path = join(tmppath, fp, fn)
     xfile = XRootDPyFile(mkurl(full_path), mode="w+")
     assert xfile is not None
-    assert xfile.read() == fc.encode()
+    assert xfile.read() == fc
 
     # Existing file is truncated
-    fd = get_tsta_file(tmppath)
-    full_path = fd["full_path"]
-    xfile = XRootDPyFile(mkurl(full_path), mode="w+")
+    xfile = XRootDPyFile(get_tsta_file(tmppath)["url"], mode="w+")
     assert xfile is not None
     assert xfile.read() == b""
     assert xfile.size == 0
@@ -68,16 +103,17 @@ def test_init_writemode_basic(tmppath):
 def test_init_readmode_basic(tmppath):
     # Non-existing file causes what?
     # Resource not found error.
-    fn, fp, fc = "nope", "data/", ""
+    fn, fp, fc = "nope", "data/", b""
     full_path = join(tmppath, fp, fn)
-    pytest.raises(ResourceNotFound, XRootDPyFile, mkurl(full_path), mode="r")
+    with pytest.raises(ResourceNotFound):
+        XRootDPyFile(mkurl(full_path), mode="r")
 
     # Existing file can be read?
     fd = get_tsta_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(full_path), mode="r")
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url, mode="r")
     assert xfile
-    assert xfile.read() == fc.encode()
+    assert xfile.read() == fc
 
 
 def get_tsta_file(tmppath):
@@ -92,47 +128,171 @@ def get_mltl_file(tmppath):
 
 def get_bin_testfile(tmppath):
     fn, fp = "binary.dat", "data"
-    return get_file_binary(fn, fp, tmppath)
+    return get_file(fn, fp, tmppath)
 
 
-def get_file(fn, fp, tmppath):
-    path = join(tmppath, fp)
-    fpp = join(path, fn)
-    fs = open_fs(path)
-    with fs.open(fn) as f:
-        fc = f.read()
-    return {"filename": fn, "dir": fp, "contents": fc, "full_path": fpp}
+@lru_cache(maxsize=None)
+def _read_file(path):
+    """Read a file which does not change during the session."""
+    return Path(path).read_bytes()
 
 
-def get_file_binary(fn, fp, tmppath):
-    path = join(tmppath, fp)
-    fpp = join(path, fn)
-    fs = open_fs(path)
-    with fs.open(fn, "rb") as f:
-        fc = f.read()
-    return {"filename": fn, "dir": fp, "contents": fc, "full_path": fpp}
+def get_file(fn, fp, tmppath):
+    fpp = join(tmppath, fp, fn)
+    # Files from tests/data are read once; tmppath starts as a copy of them.
+    src = join(dirname(__file__), fp, fn)
+    fc = _read_file(src) if exists(src) else Path(fpp).read_bytes()
+    return MappingProxyType(
+        {
+            "filename": fn,
+            "dir": fp,
+            "contents": fc,
+            "full_path": fpp,
+            "url": mkurl(fpp),
+        }
+    )
 
 
 def copy_file(fn, fp, tmppath):
+    # shutil.copyfile() copies in the kernel (sendfile/copy_file_range).
     path = join(tmppath, fp)
     fn_new = fn + "_copy"
-    this_fs = open_fs(path)
-    this_fs.copy(fn, fn_new)
+    shutil.copyfile(join(path, fn), join(path, fn_new))
     return fn_new
 
 
-def get_copy_file(arg, binary=False):
+def get_copy_file(arg):
     # Would get called with e.g. arg=get_tsta_file(...)
     fp = fs.path.dirname(arg["full_path"])
     fn_new = copy_file(arg["filename"], "", fp)
-    return get_file_binary(fn_new, "", fp) if binary else get_file(fn_new, "", fp)
+    return get_file(fn_new, "", fp)
+
+
+class Mirror(object):
+    """Apply each operation to both an XRootDPyFile and a reference file.
+
+    Return values of ``read``, ``readline`` and ``tell`` must be equal.
+    """
+
+    compared = ("read", "readline", "tell")
+
+    def __init__(self, xfile, pfile):
+        self.xfile = xfile
+        self.pfile = pfile
+
+    def __getattr__(self, name):
+        xmethod, pmethod = getattr(self.xfile, name), getattr(self.pfile, name)
+
+        def call(*args, **kwargs):
+            xres = xmethod(*args, **kwargs)
+            pres = pmethod(*args, **kwargs)
+            if name in self.compared:
+                assert xres == pres
+            return xres
+
+        return call
+
+
+class RawFile(object):
+    """Unbuffered reference file doing one ``pread``/``pwrite`` per call."""
+
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_RDWR)
+        self.pos = 0
+
+    def read(self, size=-1):
+        if size < 0:
+            size = max(os.fstat(self.fd).st_size - self.pos, 0)
+        data = os.pread(self.fd, size, self.pos)
+        self.pos += len(data)
+        return data
+
+    def write(self, data):
+        self.pos += os.pwrite(self.fd, data, self.pos)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.pos
+        elif whence == os.SEEK_END:
+            offset += os.fstat(self.fd).st_size
+        self.pos = offset
+
+    def tell(self):
+        return self.pos
+
+    def truncate(self, size=None):
+        os.ftruncate(self.fd, self.pos if size is None else size)
+
+    def close(self):
+        os.close(self.fd)
+
+
+@pytest.fixture
+def tsta_file(tmppath):
+    """Description of ``testa.txt``, see ``get_file()``."""
+    return get_tsta_file(tmppath)
+
+
+@pytest.fixture
+def mltl_file(tmppath):
+    """Description of ``multiline.txt``, see ``get_file()``."""
+    return get_mltl_file(tmppath)
+
+
+@pytest.fixture
+def bin_file(tmppath):
+    """Description of ``binary.dat``, see ``get_file()``."""
+    return get_bin_testfile(tmppath)
+
+
+class XFilePool(object):
+    """Open files shared within a test, keyed by ``(url, mode)``."""
 
+    def __init__(self):
+        self._files = {}
 
-def test_open_close(tmppath):
+    def get(self, url, mode="r"):
+        """Get an open file, rewound to the start if it is seekable."""
+        xfile = self._files.get((url, mode))
+        if xfile is None or xfile.closed:
+            xfile = self._files[(url, mode)] = XRootDPyFile(url, mode)
+        elif xfile.seekable():
+            xfile.seek(0)
+        return xfile
+
+    def close(self):
+        """Close all files."""
+        for xfile in self._files.values():
+            xfile.close()
+
+
+@pytest.fixture
+def xfile_pool():
+    """Pool of open files which are closed at the end of the test."""
+    pool = XFilePool()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def tsta_xfile(request, tsta_file):
+    """``testa.txt`` opened in the mode given by ``request.param``."""
+    xfile = XRootDPyFile(tsta_file["url"], request.param)
+    yield xfile
+    xfile.close()
+
+
+@pytest.fixture
+def xfile_ro(tsta_file):
+    """``testa.txt`` opened read-only."""
+    xfile = XRootDPyFile(tsta_file["url"], "r")
+    yield xfile
+    xfile.close()
+
+
+def test_open_close(xfile_ro):
     """Test close() on an open file."""
-    fd = get_tsta_file(tmppath)
-    full_path = fd["full_path"]
-    xfile = XRootDPyFile(mkurl(full_path))
+    xfile = xfile_ro
     assert xfile
     assert not xfile.closed
     xfile.close()
@@ -141,133 +301,299 @@ def test_open_close(tmppath):
     xfile.close()
 
 
-def test_close_error(tmppath):
-    """Test error on close()."""
-    xfile = XRootDPyFile(mkurl(get_tsta_file(tmppath)["full_path"]))
-    # Mock error response on close.
-    fake_status = {
-        "status": 1,
-        "code": 3,
-        "ok": False,
-        "errno": 0,
-        "error": True,
-        "message": "[ERROR] Invalid operation",
-        "fatal": False,
-        "shellcode": 50,
-    }
-    xfile._file.close = Mock(return_value=(XRootDStatus(fake_status), None))
-    # Ensure error is raised.
-    pytest.raises(IOError, xfile.close)
+def test_close_async(tmppath, monkeypatch):
+    """Test close(sync=False)."""
+    register = Mock()
+    monkeypatch.setattr(xrdfile.atexit, "register", register)
+    monkeypatch.setattr(xrdfile, "_wait_at_exit", False)
 
+    xfile = XRootDPyFile(get_tsta_file(tmppath)["url"], "r")
+    xfile.close(sync=False)
+    assert xfile.closed
+    assert wait_for_pending_closes(timeout=10)
+    # Closing again does nothing.
+    xfile.close()
 
-def test_read_existing(tmppath):
+    # Waiting for pending closes at exit is registered once, on first use.
+    XRootDPyFile(get_tsta_file(tmppath)["url"], "r").close(sync=False)
+    assert wait_for_pending_closes(timeout=10)
+    register.assert_called_once_with(wait_for_pending_closes, 30)
+
+
+@pytest.mark.parametrize(
+    "client_method,call",
+    [
+        ("close", lambda xfile: xfile.close()),
+        ("read", lambda xfile: xfile.read()),
+        ("stat", lambda xfile: xfile.size),
+        ("stat", lambda xfile: len(xfile)),
+        ("truncate", lambda xfile: xfile.truncate(0)),
+        ("write", lambda xfile: xfile.write(b"x")),
+    ],
+    ids=["close", "read", "size", "len", "truncate", "write"],
+)
+def test_client_error(tsta_file, client_method, call):
+    """Test that an error from the XRootD client is raised as IOError."""
+    xfile = XRootDPyFile(tsta_file["url"], "r+")
+    setattr(xfile._file, client_method, _fake_error)
+    with pytest.raises(IOError):
+        call(xfile)
+
+
+def test_read_existing(tsta_file, xfile_ro):
     """Test read() on an existing non-empty file."""
-    fd = get_tsta_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(full_path))
+    fc = tsta_file["contents"]
+    xfile = xfile_ro
 
     res = xfile.read()
-    assert res == fc.encode()
+    assert res == fc
     # After having read the entire file, the file pointer is at the
     # end of the file and consecutive reads return the empty string.
     assert xfile.read() == b""
+    assert _drain(xfile) == 0
 
     # reset ipp to start
     xfile.seek(0)
-    assert xfile.read(1) == fc[0].encode()
-    assert xfile.read(2) == fc[1:3].encode()
+    assert xfile.read(1) == fc[0:1]
+    assert xfile.read(2) == fc[1:3]
     overflow_read = xfile.read(len(fc))
-    assert overflow_read == fc[3:].encode()
+    assert overflow_read == fc[3:]
+
+
+def test_read_ahead(mltl_file):
+    """Test that small reads are served from the read-ahead buffer."""
+    fd = mltl_file
+    url, fc = fd["url"], fd["contents"]
+
+    # Refills keep the consumed tail, so short backward seeks stay cached.
+    xfile = XRootDPyFile(url, "r", buffer_size=8)
+    assert xfile.read(6) == fc[0:6]
+    assert xfile.read(6) == fc[6:12]
+    xfile._file.read = _fake_error
+    xfile.seek(4)
+    assert xfile.read(4) == fc[4:8]
+
+    # Short forward seeks fetch the skipped bytes too, so they can be
+    # read after seeking back.
+    xfile = XRootDPyFile(url, "r", buffer_size=8)
+    assert xfile.read(4) == fc[0:4]
+    xfile.seek(12)
+    assert xfile.read(4) == fc[12:16]
+    xfile._file.read = _fake_error
+    xfile.seek(9)
+    assert xfile.read(4) == fc[9:13]
+
+    xfile = XRootDPyFile(url, "r+")
+    assert xfile.read(1) == fc[0:1]
+    # The rest of the file was fetched along with the first byte.
+    xfile._file.read = _fake_error
+    assert xfile.read(2) == fc[1:3]
+    xfile.seek(0)
+    assert xfile.read(len(fc) + 1) == fc
+    with pytest.raises(IOError):
+        xfile.read()
 
-    # Mock an error, yayy!
-    fake_status = {
-        "status": 3,
-        "code": 0,
-        "ok": False,
-        "errno": errno.EREMOTE,
-        "error": True,
-        "message": "[FATAL] Remote I/O Error",
-        "fatal": True,
-        "shellcode": 51,
-    }
-    xfile._file.read = Mock(return_value=(XRootDStatus(fake_status), None))
-    pytest.raises(IOError, xfile.read)
+    # Writes drop the buffer.
+    xfile.seek(0)
+    xfile.write(b"X")
+    xfile.seek(0)
+    with pytest.raises(IOError):
+        xfile.read(1)
+
+    # buffering=0 disables read-ahead.
+    xfile = XRootDPyFile(url, "rb", buffering=0)
+    assert xfile.read(1) == b"X"
+    xfile._file.read = _fake_error
+    with pytest.raises(IOError):
+        xfile.read(1)
+
+
+def test_read_prefetch(mltl_file):
+    """Test that sequential reads request the next block in the background."""
+    fd = mltl_file
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url, "r+", buffer_size=20)
+    xfile._file.read = Mock(wraps=xfile._file.read)
+    assert b"".join(iter(lambda: xfile.read(10), b"")) == fc
+    calls = [
+        (c.kwargs["offset"], c.kwargs["size"], "callback" in c.kwargs)
+        for c in xfile._file.read.call_args_list
+    ]
+    # The buffer is extended once before every further block is prefetched.
+    assert calls[:2] == [(0, 20, False), (20, 20, False)]
+    assert calls[2:] == [(offset, 20, True) for offset in range(40, len(fc), 20)]
+
+    # Writes drop the prefetched block.
+    xfile = XRootDPyFile(url, "r+", buffer_size=20)
+    assert xfile.read(10) == fc[:10]
+    assert xfile.read(15) == fc[10:25]
+    assert xfile._prefetch is not None
+    xfile.write(b"X")
+    assert xfile._prefetch is None
+    assert xfile.read(10) == fc[26:36]
+
+
+def test_readv(mltl_file):
+    """Test readv()."""
+    fd = mltl_file
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url)
+
+    ranges = [(0, 4), (10, 3), (len(fc) - 2, 10), (len(fc) + 1, 4), (5, 0)]
+    assert xfile.readv(ranges) == [fc[0:4], fc[10:13], fc[-2:], b"", b""]
+    assert xfile.readv([]) == []
+    # The file pointer is not moved.
+    assert xfile.tell() == 0
+
+    # The server limits are queried once per endpoint.
+    assert spliturl(url)[0] in _server_limits
+
+    # Ranges are split into chunks and requests within the limits.
+    xfile._file.vector_read = Mock(wraps=xfile._file.vector_read)
+    _server_limits[spliturl(url)[0]] = (2, 3)
+    assert xfile.readv([(0, 8), (12, 2)]) == [fc[0:8], fc[12:14]]
+    requests = [c.kwargs["chunks"] for c in xfile._file.vector_read.call_args_list]
+    assert [len(chunks) for chunks in requests] == [2, 2]
+    assert all(n <= 3 for chunks in requests for _, n in chunks)
+    del _server_limits[spliturl(url)[0]]
+
+    xfile._file.vector_read = _fake_error
+    with pytest.raises(IOError):
+        xfile.readv([(0, 1)])
+    xfile.close()
+    with pytest.raises(ValueError):
+        xfile.readv([(0, 1)])
+
+    xfile = XRootDPyFile(url, "r-")
+    with pytest.raises(IOError):
+        xfile.readv([(0, 1)])
+
+
+def test_read_vector(mltl_file, monkeypatch):
+    """Test large reads are sent as vector reads."""
+    fd = mltl_file
+    url, fc = fd["url"], fd["contents"]
+    monkeypatch.setattr(xrdfile, "VECTOR_READ_THRESHOLD", 16)
+    monkeypatch.setitem(_server_limits, spliturl(url)[0], (4, 10))
+    xfile = XRootDPyFile(url, buffering=0)
+    xfile._file.vector_read = Mock(wraps=xfile._file.vector_read)
+    xfile._file.read = _fake_error
+
+    xfile.seek(5)
+    assert xfile.read(50) == fc[5:55]
+    assert xfile.tell() == 55
+    assert xfile._file.vector_read.call_args_list == [
+        call(chunks=[(5, 10), (15, 10), (25, 10), (35, 10)]),
+        call(chunks=[(45, 10)]),
+    ]
+    assert xfile.read() == fc[55:]
+
+    xfile._file.vector_read = _fake_error
+    xfile.seek(0)
+    with pytest.raises(IOError):
+        xfile.read()
+
+
+def test_readinto(mltl_file):
+    """Test readinto()."""
+    fd = mltl_file
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url)
+
+    buf = bytearray(10)
+    assert xfile.readinto(buf) == 10
+    assert buf == fc[:10]
+    assert xfile.tell() == 10
+    assert xfile.readinto(bytearray()) == 0
+
+    buf = bytearray(len(fc))
+    assert xfile.readinto(memoryview(buf)[:4]) == 4
+    assert buf[:4] == fc[10:14]
+    assert xfile.readinto(buf) == len(fc) - 14
+    assert xfile.readinto(buf) == 0
+
+    xfile.close()
+    with pytest.raises(ValueError):
+        xfile.readinto(buf)
+
+
+def test_digest(tmppath):
+    """Test digest()."""
+    fd = get_mltl_file(tmppath)
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url)
+    xfile.seek(5)
+
+    assert xfile.digest() == hashlib.sha256(fc).digest()
+    assert xfile.digest("md5") == hashlib.md5(fc).digest()
+    assert xfile.tell() == 5
+
+    xfile._file.read = _fake_error
+    with pytest.raises(IOError):
+        xfile.digest()
+    xfile.close()
+    with pytest.raises(ValueError):
+        xfile.digest()
+
+    xfile = XRootDPyFile(mkurl(join(tmppath, "data/empty.txt")), "w+")
+    assert xfile.digest() == hashlib.sha256().digest()
 
 
-def test__is_open(tmppath):
+def test__is_open(xfile_ro):
     """Test _is_open()"""
-    fd = get_tsta_file(tmppath)
-    full_path = fd["full_path"]
-    xfile = XRootDPyFile(mkurl(full_path))
+    xfile = xfile_ro
     assert not xfile.closed
     xfile.close()
     assert xfile.closed
 
 
-def test_size_len(tmppath):
+def test_size_len(tmppath, xfile_pool):
     """Tests for the size and len property."""
     fd = get_tsta_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(full_path))
+    url, fc = fd["url"], fd["contents"]
+    xfile = xfile_pool.get(url)
 
     assert xfile.size == len(fc)
     assert len(xfile) == len(fc)
 
     # Length of empty file
     xfile = XRootDPyFile(mkurl(join(tmppath, fd["dir"], "whut")), "w+")
-    assert xfile.size == len("")
-    assert len(xfile) == len("")
+    # Files opened for writing are truncated, no need to stat them.
+    xfile._file.stat = _fake_error
+    assert xfile.size == 0
+    assert len(xfile) == 0
 
     # Length of multiline file
     fd = get_mltl_file(tmppath)
-    fpp, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(fpp))
+    url, fc = fd["url"], fd["contents"]
+    xfile = xfile_pool.get(url)
     assert xfile.size == len(fc)
     assert len(xfile) == len(fc)
 
-    # Mock the error
-    fake_status = {
-        "status": 3,
-        "code": 0,
-        "ok": False,
-        "errno": errno.EREMOTE,
-        "error": True,
-        "message": "[FATAL] Remote I/O Error",
-        "fatal": True,
-        "shellcode": 51,
-    }
-    xfile.close()
-    xfile = XRootDPyFile(mkurl(full_path))
-    xfile._file.stat = Mock(return_value=(XRootDStatus(fake_status), None))
-    try:
-        xfile.size
-        assert False
-    except IOError:
-        assert True
-
-    try:
-        len(xfile)
-        assert False
-    except IOError:
-        assert True
+    # Size is cached after the first stat, so later lookups never hit the
+    # server again.
+    xfile._file.stat = _fake_error
+    assert xfile.size == len(fc)
+    assert len(xfile) == len(fc)
+    assert _drain(xfile) == len(fc)
 
 
-def test_seek_and_tell(tmppath):
+def test_seek_and_tell(tmppath, xfile_pool):
     """Basic tests for seek() and tell()."""
     fd = get_tsta_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(full_path))
+    url, fc = fd["url"], fd["contents"]
+    xfile = xfile_pool.get(url)
     assert xfile.tell() == 0
 
     # Read file, then check the internal position pointer.
     conts = xfile.read()
     assert xfile.tell() == len(fc)
-    assert conts == fc.encode()
+    assert conts == fc
 
     # Seek to beginning, then verify ipp.
     xfile.seek(0)
     assert xfile.tell() == 0
-    assert xfile.read() == fc.encode()
+    assert xfile.read() == fc
 
     newpos = len(fc) // 2
     xfile.seek(newpos)
@@ -277,8 +603,8 @@ def test_seek_and_tell(tmppath):
 
     # # Now with a multiline file!
     fd = get_mltl_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(full_path))
+    url, fc = fd["url"], fd["contents"]
+    xfile = xfile_pool.get(url)
 
     assert xfile.tell() == 0
     newpos = len(fc) // 3
@@ -286,90 +612,82 @@ def test_seek_and_tell(tmppath):
     assert xfile.tell() == newpos
     nconts = xfile.read()
     assert xfile.tell() == len(fc)
-    assert nconts == fc[newpos:].encode()
+    assert nconts == fc[newpos:]
 
     # Negative offsets raise an error
-    pytest.raises(IOError, xfile.seek, -1)
+    with pytest.raises(IOError):
+        xfile.seek(-1)
 
-    # floating point offsets are converted to integers
-    xfile.seek(1.1)
-    assert xfile.tell() == 1
-    xfile.seek(0.999999)
-    assert xfile.tell() == 0
+
+@pytest.mark.parametrize("offset,expected", [(1.1, 1), (0.999999, 0), (2.5, 2)])
+def test_seek_float(xfile_ro, offset, expected):
+    """Floating point offsets are truncated to integers."""
+    xfile_ro.seek(offset)
+    assert xfile_ro.tell() == expected
+    assert type(xfile_ro.tell()) is int
 
 
-def test_seek_args(tmppath):
+def test_seek_args(tsta_file):
     """Test seek() with a non-default whence argument."""
-    fd = get_tsta_file(tmppath)
+    fd = tsta_file
     fb = get_copy_file(fd)
-    full_path, fc = fd["full_path"], fd["contents"]
+    url, fc = fd["url"], fd["contents"]
 
-    xfile = XRootDPyFile(mkurl(full_path), "r+")
-    pfile = open(fb["full_path"], "rb+")
+    xfile = XRootDPyFile(url, "r+")
+    pfile = RawFile(fb["full_path"])
+    m = Mirror(xfile, pfile)
 
-    xfile.truncate(3), pfile.truncate(3)
-    xfile.seek(2, Seek.end), pfile.seek(2, Seek.end)
-    assert xfile.tell() == pfile.tell()
+    m.truncate(3)
+    m.seek(2, Seek.end)
+    m.tell()
 
-    xfile.seek(3, Seek.current), pfile.seek(3, Seek.current)
-    assert xfile.tell() == pfile.tell()
+    m.seek(3, Seek.current)
+    m.tell()
 
-    xfile.seek(8, Seek.set), pfile.seek(8, Seek.set)
-    assert xfile.tell() == pfile.tell()
+    m.seek(8, Seek.set)
+    m.tell()
 
-    xfile.truncate(3), pfile.truncate(3)
-    xfile.read(), pfile.read()
-    assert xfile.tell() == pfile.tell()
-    xfile.seek(8, Seek.end), pfile.seek(8, Seek.end)
-    assert xfile.tell() == pfile.tell()
+    m.truncate(3)
+    m.read()
+    m.tell()
+    m.seek(8, Seek.end)
+    m.tell()
 
-    xfile.seek(4, Seek.current), pfile.seek(4, Seek.current)
-    assert xfile.tell() == pfile.tell()
+    m.seek(4, Seek.current)
+    m.tell()
 
-    pytest.raises(NotImplementedError, xfile.seek, 0, 8)
+    with pytest.raises(NotImplementedError):
+        xfile.seek(0, 8)
+    pfile.close()
 
 
-def test_tell_after_open(tmppath):
+@pytest.mark.parametrize(
+    "tsta_xfile,expected_tell",
+    [
+        ("r", 0),
+        ("r+", 0),
+        ("r-", 0),
+        ("a", "len"),
+        ("a+", "len"),
+        ("w", 0),
+        ("w-", 0),
+    ],
+    indirect=["tsta_xfile"],
+)
+def test_tell_after_open(tsta_file, tsta_xfile, expected_tell):
     """Tests for tell's init values in the various file modes."""
-    fd = get_tsta_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
-
-    xfile = XRootDPyFile(mkurl(full_path), "r")
-    assert xfile.tell() == 0
-    xfile.close()
-
-    xfile = XRootDPyFile(mkurl(full_path), "r+")
-    assert xfile.tell() == 0
-    xfile.close()
+    if expected_tell == "len":
+        expected_tell = len(tsta_file["contents"])
+    assert tsta_xfile.tell() == expected_tell
 
-    xfile = XRootDPyFile(mkurl(full_path), "r-")
-    assert xfile.tell() == 0
-    xfile.close()
 
-    xfile = XRootDPyFile(mkurl(full_path), "a")
-    assert xfile.tell() == len(fc)
-    xfile.close()
-
-    xfile = XRootDPyFile(mkurl(full_path), "a+")
-    assert xfile.tell() == len(fc)
-    xfile.close()
-
-    xfile = XRootDPyFile(mkurl(full_path), "w")
-    assert xfile.tell() == 0
-    xfile.close()
-
-    xfile = XRootDPyFile(mkurl(full_path), "w-")
-    assert xfile.tell() == 0
-    xfile.close()
-
-
-def test_truncate1(tmppath):
+def test_truncate1(tsta_file):
     """Test truncate(0)."""
-    fd = get_tsta_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(full_path), "r+")
+    fd = tsta_file
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url, "r+")
     # r+ opens for r/w, and won't truncate the file automatically.
-    assert xfile.read() == fc.encode()
+    assert xfile.read() == fc
     assert xfile.tell() == len(fc)
     xfile.seek(0)  # Reset ipp.
     assert xfile.tell() == 0
@@ -380,12 +698,9 @@ def test_truncate1(tmppath):
     assert xfile.tell() == 0
     assert xfile.read() == b""
     assert xfile.tell() == 0
-    xfile.close()
 
-    # Re-open same file.
-    xfile = XRootDPyFile(mkurl(full_path), "r+")
-    assert xfile.size == 0
-    assert xfile.read() == b""
+    # Force the truncation to the server, then keep using the same handle.
+    assert xfile._file.sync()[0].ok
 
     # Truncate it again!
     xfile.truncate(0)
@@ -406,34 +721,23 @@ def test_truncate1(tmppath):
     assert xfile.tell() == 1
     xfile.close()
 
-    xfile = XRootDPyFile(mkurl(full_path), "r+")
+    # Re-open once to check that the state persisted across sessions.
+    xfile = XRootDPyFile(url, "r+")
     assert xfile.size == 1
     assert xfile.read() == b"\x00"
 
-    # Mock it.
-    fake_status = {
-        "status": 3,
-        "code": 0,
-        "ok": False,
-        "errno": errno.EREMOTE,
-        "error": True,
-        "message": "[FATAL] Remote I/O Error",
-        "fatal": True,
-        "shellcode": 51,
-    }
-    xfile._file.truncate = Mock(return_value=(XRootDStatus(fake_status), None))
-    pytest.raises(IOError, xfile.truncate, 0)
-
 
-def test_truncate2(tmppath):
+@pytest.mark.parametrize("tsta_xfile", ["r+"], indirect=True)
+def test_truncate2(tsta_file, tsta_xfile):
     """Test truncate(self._size)."""
-    fd = get_tsta_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(full_path), "r+")
+    fc = tsta_file["contents"]
+    xfile = tsta_xfile
     conts = xfile.read()
-    assert conts == fc.encode()
+    assert conts == fc
 
     newsize = xfile.size
+    # Truncating to the current size is not sent to the server.
+    xfile._file.truncate = _fake_error
     xfile.truncate(newsize)
     assert xfile.tell() == newsize
     assert xfile.size == len(fc)
@@ -441,11 +745,11 @@ def test_truncate2(tmppath):
     assert xfile.read() == conts
 
 
-def test_truncate3(tmppath):
+def test_truncate3(mltl_file):
     """Test truncate(0 < size < self._size)."""
-    fd = get_mltl_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(full_path), "r+")
+    fd = mltl_file
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url, "r+")
 
     initcp = xfile.tell()
 
@@ -453,31 +757,33 @@ def test_truncate3(tmppath):
     xfile.truncate(newsiz)
     assert xfile.tell() == initcp
     xfile.seek(0)  # reset the internal pointer before reading
-    assert xfile.read() == fc[:newsiz].encode()
+    assert xfile.read() == fc[:newsiz]
 
 
-def test_truncate4(tmppath):
+def test_truncate4(mltl_file):
     """Verifies that truncate() raises errors on non-truncatable files."""
-    fd = get_mltl_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
+    fd = mltl_file
+    url, fc = fd["url"], fd["contents"]
 
-    xfile = XRootDPyFile(mkurl(full_path), "r")
-    pytest.raises(IOError, xfile.truncate, 0)
+    xfile = XRootDPyFile(url, "r")
+    with pytest.raises(IOError):
+        xfile.truncate(0)
 
     xfile.close()
-    xfile = XRootDPyFile(mkurl(full_path), "w-")
-    pytest.raises(IOError, xfile.truncate, 0)
+    xfile = XRootDPyFile(url, "w-")
+    with pytest.raises(IOError):
+        xfile.truncate(0)
 
 
-def test_truncate5(tmppath):
+def test_truncate5(tsta_file):
     """Test truncate() (no arg)."""
-    fd = get_tsta_file(tmppath)
+    fd = tsta_file
     fb = get_copy_file(fd)
-    fp, fc = fd["full_path"], fd["contents"]
-    fp2 = fb["full_path"]
+    url, fc = fd["url"], fd["contents"]
+    url2 = fb["url"]
 
-    xfa = XRootDPyFile(mkurl(fp), "r+")
-    xfb = XRootDPyFile(mkurl(fp2), "r+")
+    xfa = XRootDPyFile(url, "r+")
+    xfb = XRootDPyFile(url2, "r+")
 
     acnts = xfa.read()
     assert acnts == xfb.read()
@@ -495,66 +801,44 @@ def test_truncate5(tmppath):
 
     xfa.seek(0), xfb.seek(0)
     are = xfa.read()
-    assert are == fc.encode()
+    assert are == fc
     assert are == xfb.read()
 
 
-def test_truncate_read_write(tmppath):
-    """Tests behaviour of writing after reading after truncating."""
-    fd = get_tsta_file(tmppath)
-    fb = get_copy_file(fd)
-    fp, fc = fd["full_path"], fd["contents"]
-    fp2 = fb["full_path"]
-
-    sp = len(fc) // 2
-    wstr = "I am the string"
-
-    pfile = open(fp2, "r+")
-    xfile = XRootDPyFile(mkurl(fp), "r+")
-
-    xfile.truncate(sp), pfile.truncate(sp)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-    assert xfile.tell() == pfile.tell()
-
-    xfile.write(wstr), pfile.write(wstr)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
+@pytest.mark.parametrize("tsta_xfile", ["r+"], indirect=True)
+@pytest.mark.parametrize("rewind", [False, True])
+def test_truncate_read_write(tsta_file, tsta_xfile, rewind):
+    """Tests writing after reading after truncating.
 
-    xfile.seek(0), pfile.seek(0)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-
-
-def test_truncate_read_write2(tmppath):
-    """Tests behaviour of writing after seek(0) after
-    reading after truncating."""
-    fd = get_tsta_file(tmppath)
-    fb = get_copy_file(fd)
-    fp, fc = fd["full_path"], fd["contents"]
-    fp2 = fb["full_path"]
+    With ``rewind`` the file is read once more from the start before
+    writing at position 0.
+    """
+    fc = tsta_file["contents"]
 
     sp = len(fc) // 2
-    wstr = "I am the string"
+    wstr = b"I am the string"
 
-    pfile = open(fp2, "r+")
-    xfile = XRootDPyFile(mkurl(fp), "r+")
+    pfile = io.BytesIO(fc)
+    m = Mirror(tsta_xfile, pfile)
 
-    xfile.truncate(sp), pfile.truncate(sp)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-    assert xfile.tell() == pfile.tell()
+    m.truncate(sp)
+    m.tell()
+    m.read()
+    m.tell()
 
-    xfile.seek(0), pfile.seek(0)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-    xfile.seek(0), pfile.seek(0)
+    if rewind:
+        m.seek(0)
+        m.tell()
+        m.read()
+        m.seek(0)
 
-    xfile.write(wstr), pfile.write(wstr)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-    xfile.seek(0), pfile.seek(0)
-    assert xfile.read() == pfile.read().encode()
+    m.write(wstr)
+    m.tell()
+    m.read()
+
+    m.seek(0)
+    m.tell()
+    m.read()
 
 
 def test_write(tmppath):
@@ -565,65 +849,115 @@ def test_write(tmppath):
     conts = xfile.read()
     assert not conts
 
-    nconts = "Write."
+    nconts = b"Write."
     xfile.write(nconts)
     assert xfile.tell() == len(nconts)
     assert not xfile.closed
     xfile.seek(0)
     assert xfile.size == len(nconts)
-    assert xfile.read() == nconts.encode()
+    assert xfile.read() == nconts
     xfile.close()
 
     # Verify persistence after closing.
     xfile = XRootDPyFile(mkurl(join(tmppath, "data/nuts")), "r+")
     assert xfile.size == len(nconts)
-    assert xfile.read() == nconts.encode()
+    assert xfile.read() == nconts
 
     # Seek(x>0) followed by a write
-    nc2 = "hello"
+    nc2 = b"hello"
     cntr = len(nconts) // 2
     xfile.seek(cntr)
     xfile.write(nc2)
     assert xfile.tell() == len(nc2) + cntr
     xfile.seek(0)
     expected = nconts[:cntr] + nc2
-    assert xfile.read() == expected.encode()
+    assert xfile.read() == expected
     xfile.close()
 
     # Seek(x>0) followed by a write of len < size-x
     fd = get_tsta_file(tmppath)
-    fp, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(fp), "r+")
-    assert xfile.read() == fc.encode()
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url, "r+")
+    assert xfile.read() == fc
     xfile.seek(2)
-    nc = "yo"
+    nc = b"yo"
     xfile.write(nc)
     assert xfile.tell() == len(nc) + 2
-    assert xfile.read() == fc[2 + len(nc) :].encode()
+    assert xfile.read() == fc[2 + len(nc) :]
 
     # run w/ flushing == true
-    xfile.write("", True)
+    xfile.write(b"", True)
 
-    # Mock an error, yayy!
-    fake_status = {
-        "status": 3,
-        "code": 0,
-        "ok": False,
-        "errno": errno.EREMOTE,
-        "error": True,
-        "message": "[FATAL] Remote I/O Error",
-        "fatal": True,
-        "shellcode": 51,
-    }
-    xfile._file.write = Mock(return_value=(XRootDStatus(fake_status), None))
-    pytest.raises(IOError, xfile.write, "")
+    # Empty writes are not sent to the server.
+    xfile._file.write = _fake_error
+    xfile.write(b"")
+
+
+def test_write_async(tsta_file):
+    """Test write() with async_writes."""
+    fd = tsta_file
+    xfile = XRootDPyFile(fd["url"], "w+", async_writes=True)
+    for i in range(10):
+        xfile.write(b"line %d\n" % i)
+    assert xfile.tell() == xfile.size == 70
+    xfile.seek(0)
+    assert xfile.readline() == b"line 0\n"
+    assert xfile._inflight == 0
+
+    # Errors reported by the server are raised at the next sync point.
+    real_write = xfile._file.write
+
+    def failing_write(data, offset=0, callback=None):
+        def done(status, response, hostlist):
+            callback(_FAKE_ERROR, response, hostlist)
 
+        return real_write(data, offset=offset, callback=done)
 
-def test_readwrite_diffrent_encodings_fails(tmppath):
+    xfile._file.write = failing_write
+    xfile.write(b"oops")
+    with pytest.raises(IOError):
+        xfile.flush()
+    xfile.close()
+
+    with open(fd["full_path"], "rb") as f:
+        assert f.read(70) == b"".join(b"line %d\n" % i for i in range(10))
+
+
+def test_write_buffered(tsta_file):
+    """Test write() with write_buffer_size."""
+    fd = tsta_file
+    xfile = XRootDPyFile(fd["url"], "w+", write_buffer_size=20)
+    write = xfile._file.write = Mock(wraps=xfile._file.write)
+    for i in range(4):
+        xfile.write(b"line %d\n" % i)
+    # The buffer is sent once it holds write_buffer_size bytes.
+    write.assert_called_once_with(b"line 0\nline 1\nline 2\n", offset=0)
+    assert xfile.tell() == xfile.size == 28
+
+    # Non-contiguous writes send the buffer first.
+    xfile.seek(40)
+    xfile.write(b"X")
+    assert write.call_args_list[1:] == [call(b"line 3\n", offset=21)]
+
+    # Reading sends the buffer.
+    xfile.seek(0)
+    assert xfile.read() == (
+        b"".join(b"line %d\n" % i for i in range(4)) + b"\x00" * 12 + b"X"
+    )
+    assert write.call_args_list[2:] == [call(b"X", offset=40)]
+
+    # Errors are raised when the buffer is sent.
+    xfile._file.write = _fake_error
+    xfile.write(b"oops")
+    with pytest.raises(IOError):
+        xfile.flush()
+    xfile.close()
+
+
+def test_readwrite_diffrent_encodings_fails(tsta_file):
     """Test read/write a unicode str in non unicode files."""
-    fd = get_tsta_file(tmppath)
+    fd = tsta_file
     fb = get_copy_file(fd)
-    fp, dummy = fd["full_path"], fd["contents"]
     fp2 = fb["full_path"]
 
     unicodestr = "æøå"
@@ -632,28 +966,27 @@ def test_readwrite_diffrent_encodings_fails(tmppath):
     # unicode is handled by default in python 3
     # pytest.raises(UnicodeEncodeError, pfile.write, unicodestr)
     pfile.close()
-    xfile = XRootDPyFile(mkurl(fp), "w", encoding="ascii")
-    pytest.raises(UnicodeEncodeError, xfile.write, unicodestr)
+    xfile = XRootDPyFile(fd["url"], "w", encoding="ascii")
+    with pytest.raises(UnicodeEncodeError):
+        xfile.write(unicodestr)
     xfile.close()
 
 
 def test_readwrite_unicode(tmppath):
     """Test read/write a unicode str in unicode files."""
-    fd = get_tsta_file(tmppath)
-    fb = get_copy_file(fd)
-    fp, dummy = fd["full_path"], fd["contents"]
-    fp2 = fb["full_path"]
-
+    url = get_tsta_file(tmppath)["url"]
     unicodestr = "æøå"
 
-    xfile = XRootDPyFile(mkurl(fp), "w+")  # default encoding is UTF-8
+    xfile = XRootDPyFile(url, "w+", encoding="utf-8")
     xfile.write(unicodestr)
     xfile.flush()
     xfile.seek(0)
     assert unicodestr.encode("utf8") == xfile.read()
-    xfile.close()
 
-    xfile = XRootDPyFile(mkurl(fp), "w+", encoding="ascii", errors="ignore")
+    # Same handle, different encoding policy.
+    xfile.seek(0)
+    xfile.truncate(0)
+    xfile.encoding, xfile.errors = "ascii", "ignore"
     xfile.write(unicodestr)
     xfile.flush()
     xfile.seek(0)
@@ -665,47 +998,51 @@ def test_init_paths(tmppath):
     """Tests how __init__ responds to correct and invalid paths."""
     # Invalid url should raise error
     url = "fee-fyyy-/fooo"
-    assert not is_valid_url(url) and pytest.raises(PathError, XRootDPyFile, url)
+    assert not is_valid_url(url)
+    with pytest.raises(PathError):
+        XRootDPyFile(url)
 
     path = "//ARGMEGXXX//\\///"
-    assert not is_valid_path(path) and pytest.raises(
-        InvalidPath, XRootDPyFile, mkurl(path)
-    )
+    assert not is_valid_path(path)
+    with pytest.raises(InvalidPath):
+        XRootDPyFile(mkurl(path))
 
 
-def test_init_append(tmppath):
+def test_init_append(tsta_file):
     """Test for files opened 'a'"""
-    fd = get_tsta_file(tmppath)
-    fp, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(fp), "a")
+    fd = tsta_file
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url, "a")
     assert xfile.mode == "a"
-    pytest.raises(IOError, xfile.read)
+    with pytest.raises(IOError):
+        xfile.read()
     assert xfile.tell() == len(fc)
 
     # Seeking is allowed, but writes still go on the end.
     xfile.seek(0)
     assert xfile.tell() == 0
-    newcont = "butterflies"
+    newcont = b"butterflies"
     xfile.write(newcont)
     assert xfile.tell() == len(fc) + len(newcont)
     # Can't read in this mode.
     xfile.close()
-    xfile = XRootDPyFile(mkurl(fp), "r")
+    xfile = XRootDPyFile(url, "r")
     expected = fc + newcont
-    assert xfile.read() == expected.encode()
+    assert xfile.read() == expected
 
     xfile.close()
-    xfile = XRootDPyFile(mkurl(fp), "a")
+    xfile = XRootDPyFile(url, "a")
     xfile.write(fc)
     xfile.seek(0)
-    pytest.raises(IOError, xfile.read)
+    with pytest.raises(IOError):
+        xfile.read()
 
 
-def test_init_appendread(tmppath):
+def test_init_appendread(tsta_file):
     """Test for files opened in mode 'a+'."""
-    fd = get_tsta_file(tmppath)
-    fp, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(fp), "a+")
+    fd = tsta_file
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url, "a+")
     assert xfile.mode == "a+"
     assert xfile.tell() == len(fc)
     assert xfile.read() == b""
@@ -713,250 +1050,233 @@ def test_init_appendread(tmppath):
     # Seeking is allowed, but writes still go on the end.
     xfile.seek(0)
     assert xfile.tell() == 0
-    newcont = "butterflies"
+    newcont = b"butterflies"
     xfile.write(newcont)
     assert xfile.tell() == len(fc) + len(newcont)
     xfile.seek(0)
     expected = fc + newcont
-    assert xfile.read() == expected.encode()
+    assert xfile.read() == expected
     xfile.write(fc)
     xfile.seek(0)
     expected = fc + newcont + fc
-    xfile.read() == expected.encode()
+    xfile.read() == expected
 
 
-def test_init_writemode(tmppath):
+def test_init_writemode(tsta_file):
     """Tests for opening files in 'w(+)'"""
-    fd = get_tsta_file(tmppath)
-    fp, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(fp), "w")
-    pytest.raises(IOError, xfile.read)
+    fd = tsta_file
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url, "w")
+    with pytest.raises(IOError):
+        xfile.read()
 
     xfile.seek(1)
-    conts = "what"
+    conts = b"what"
     xfile.write(conts)
     assert xfile.tell() == 1 + len(conts)
     assert xfile.size == 1 + len(conts)
     xfile.close()
-    xfile = XRootDPyFile(mkurl(fp), "r")
+    xfile = XRootDPyFile(url, "r")
     fc = xfile.read()
-    expected = "\x00" + conts
-    assert fc == expected.encode()
+    expected = b"\x00" + conts
+    assert fc == expected
     assert not fc == conts
 
 
-def test_init_streammodes(tmppath):
-    fd = get_tsta_file(tmppath)
-    fp, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(fp), "r-")
-    pytest.raises(IOError, xfile.seek, 3)
+def test_seek_write_single_call(tsta_file):
+    """Test seek() is local and the next write() carries the offset."""
+    xfile = XRootDPyFile(tsta_file["url"], "r+")
+    xfile._file.write = Mock(wraps=xfile._file.write)
+    xfile._file.read = _fake_error
+
+    xfile.seek(3)
+    xfile.write(b"what")
+    xfile._file.write.assert_called_once_with(b"what", offset=3)
+    xfile.close()
+    fc = tsta_file["contents"]
+    assert XRootDPyFile(tsta_file["url"]).read() == fc[:3] + b"what" + fc[7:]
+
+
+def test_init_streammodes(tsta_file):
+    fd = tsta_file
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url, "r-")
+    with pytest.raises(IOError):
+        xfile.seek(3)
     assert xfile.size == len(fc)
     assert xfile.tell() == 0
-    assert xfile.read() == fc.encode()
+    assert xfile.read() == fc
     assert xfile.tell() == len(fc)
 
     xfile.close()
-    xfile = XRootDPyFile(mkurl(fp), "w-")
-    pytest.raises(IOError, xfile.read)
-    pytest.raises(IOError, xfile.seek, 3)
+    xfile = XRootDPyFile(url, "w-")
+    with pytest.raises(IOError):
+        xfile.read()
+    with pytest.raises(IOError):
+        xfile.seek(3)
     assert xfile.tell() == 0
     assert xfile.size == 0
-    conts = "hugs are delightful"
+    conts = b"hugs are delightful"
     xfile.write(conts)
     assert xfile.tell() == len(conts)
     xfile.close()
-    xfile = XRootDPyFile(mkurl(fp), "r")
-    assert xfile.read() == conts.encode()
+    xfile = XRootDPyFile(url, "r")
+    assert xfile.read() == conts
 
 
-def test_init_newline(tmppath):
+def test_init_newline(tsta_file):
     """Tests fs.open() with specified newline parameter."""
-    fd = get_tsta_file(tmppath)
-    fp, fc = fd["full_path"], fd["contents"]
+    fd = tsta_file
+    url, fc = fd["url"], fd["contents"]
 
-    xfile = XRootDPyFile(mkurl(fp))
+    xfile = XRootDPyFile(url)
     assert xfile._newline == b"\n"
     xfile.close()
 
-    xfile = XRootDPyFile(mkurl(fp), newline="\n")
+    xfile = XRootDPyFile(url, newline="\n")
     assert xfile._newline == "\n"
     xfile.close()
 
-    pytest.raises(Unsupported, XRootDPyFile, mkurl(fp), mode="r", newline="what")
-
-
-def test_init_notimplemented(tmppath):
-    """Tests that specifying not-implemented args to XRDFile's constructor
-    results in an error."""
-    fd = get_tsta_file(tmppath)
-    fp, fc = fd["full_path"], fd["contents"]
-
-    pytest.raises(Unsupported, XRootDPyFile, mkurl(fp), "rb", buffering=1)
-    pytest.raises(NotImplementedError, XRootDPyFile, mkurl(fp), line_buffering="")
-
 
-def test_read_errors(tmppath):
-    fd = get_tsta_file(tmppath)
-    fp, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(fp), "r")
+@pytest.mark.parametrize(
+    "kwargs,exc",
+    [
+        (dict(mode="rb", buffering=1), Unsupported),
+        (dict(line_buffering=""), NotImplementedError),
+        (dict(mode="r", newline="what"), Unsupported),
+    ],
+)
+def test_init_argvalidation(tmppath, kwargs, exc):
+    """Tests that invalid constructor arguments are rejected before opening."""
+    # The file does not exist, so reaching the server would raise
+    # ResourceNotFound instead.
+    url = mkurl(join(tmppath, "data/nope"))
+    with pytest.raises(exc):
+        XRootDPyFile(url, **kwargs)
+
+
+def test_read_errors(xfile_ro):
+    xfile = xfile_ro
     xfile.close()
-    pytest.raises(ValueError, xfile.read)
+    with pytest.raises(ValueError):
+        xfile.read()
 
 
-def test_read_and_write(tmppath):
+def test_read_and_write(tsta_file):
     """Tests that the XRDFile behaves like a regular python file."""
-    fd = get_tsta_file(tmppath)
-    fb = get_copy_file(fd)
-    fp, fc = fd["full_path"], fd["contents"]
-    fp2 = fb["full_path"]
+    fd = tsta_file
+    url, fc = fd["url"], fd["contents"]
 
     seekpoint = len(fc) // 2
-    writestr = "Come what may in May this day says Ray all gay like Jay"
+    writestr = b"Come what may in May this day says Ray all gay like Jay"
 
-    pfile = open(fp2, "r+")
-    xfile = XRootDPyFile(mkurl(fp), "r+")
+    pfile = io.BytesIO(fc)
+    xfile = XRootDPyFile(url, "r+")
+    m = Mirror(xfile, pfile)
 
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-    assert xfile.tell() == pfile.tell()
+    m.tell()
+    m.read()
+    m.tell()
 
-    xfile.seek(seekpoint), pfile.seek(seekpoint)
-    assert xfile.tell() == pfile.tell()
-    xfile.write(writestr), pfile.write(writestr)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
+    m.seek(seekpoint)
+    m.tell()
+    m.write(writestr)
+    m.tell()
+    m.read()
 
-    xfile.seek(0), pfile.seek(0)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
+    m.seek(0)
+    m.tell()
+    m.read()
 
 
-def test_write_and_read(tmppath):
+def test_write_and_read(tsta_file):
     """Tests that the XRootDPyFile behaves like a regular python file in w+."""
-    fd = get_tsta_file(tmppath)
-    fb = get_copy_file(fd)
-    fp, fc = fd["full_path"], fd["contents"]
-    fp2 = fb["full_path"]
+    fd = tsta_file
+    url = fd["url"]
 
-    writestr = "Hello fair mare what fine stairs."
+    writestr = b"Hello fair mare what fine stairs."
     seekpoint = len(writestr) // 2
     # In 'w' (and variant modes) the file's contents are deleted upon opening.
 
-    pfile = open(fp2, "w+")
-    xfile = XRootDPyFile(mkurl(fp), "w+")
-
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-    assert xfile.tell() == pfile.tell()
-
-    xfile.write(writestr), pfile.write(writestr)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-    xfile.seek(0), pfile.seek(0)
-    assert xfile.read() == pfile.read().encode()
-    assert xfile.tell() == pfile.tell()
-
-    xfile.seek(seekpoint), pfile.seek(seekpoint)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-    assert xfile.tell() == pfile.tell()
-
-
-def test_seek_past_eof_rw(tmppath):
-    """Tests read/write/truncate behaviour after seeking past the EOF, 'r+'."""
-    fd = get_tsta_file(tmppath)
-    fb = get_copy_file(fd)
-    fp, fc = fd["full_path"], fd["contents"]
-    fp2 = fb["full_path"]
-
-    wstr = "www"
-    eof = len(fc)
-    skpnt = len(fc) + 4
-
-    pfile = open(fp2, "r+")
-    xfile = XRootDPyFile(mkurl(fp), "r+")
-
-    xfile.seek(skpnt), pfile.seek(skpnt)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-    assert xfile.tell() == pfile.tell()
-    assert xfile.tell() == skpnt
-
-    xfile.write(wstr), pfile.write(wstr)
-    assert xfile.tell() == pfile.tell()
-    xfile.seek(eof), pfile.seek(eof)
-    expected = "\x00" * (skpnt - eof) + wstr
-    assert xfile.read() == pfile.read().encode() == expected.encode()
-    assert xfile.tell() == pfile.tell()
+    pfile = io.BytesIO()
+    xfile = XRootDPyFile(url, "w+")
+    m = Mirror(xfile, pfile)
 
-    xfile.seek(0), pfile.seek(0)
-    assert xfile.read() == pfile.read().encode()
+    m.tell()
+    m.read()
+    m.tell()
 
-    xfile.truncate(skpnt), pfile.truncate(skpnt)
-    assert xfile.tell() == pfile.tell() == skpnt + len(wstr)
+    m.write(writestr)
+    m.tell()
+    m.read()
+    m.seek(0)
+    m.read()
+    m.tell()
 
-    xfile.write(wstr), pfile.write(wstr)
-    expected = fc + "\x00" * (skpnt - eof + len(wstr)) + wstr
-    xfile.seek(0), pfile.seek(0)
-    assert xfile.read() == pfile.read().encode() == expected.encode()
+    m.seek(seekpoint)
+    m.tell()
+    m.read()
+    m.tell()
 
 
-def test_seek_past_eof_wr(tmppath):
-    """Tests read/write/truncate behaviour after seeking past the EOF, 'w+'"""
+@pytest.mark.parametrize("mode", ["r+", "w+"])
+def test_seek_past_eof(tmppath, mode):
+    """Tests read/write/truncate behaviour after seeking past the EOF."""
     fd = get_tsta_file(tmppath)
-    fb = get_copy_file(fd)
-    fp, fc = fd["full_path"], ""
-    fp2 = fb["full_path"]
+    # 'w+' truncates the file on open.
+    fc = fd["contents"] if mode == "r+" else b""
 
-    wstr = "www"
+    wstr = b"www"
     eof = len(fc)
     skpnt = len(fc) + 4
 
-    pfile = open(fp2, "w+")
-    xfile = XRootDPyFile(mkurl(fp), "w+")
+    pfile = open(get_copy_file(fd)["full_path"], mode + "b")
+    xfile = XRootDPyFile(fd["url"], mode)
+    m = Mirror(xfile, pfile)
+
+    m.seek(skpnt)
+    m.tell()
+    m.read()
+    assert m.tell() == skpnt
+
+    m.write(wstr)
+    m.tell()
+    m.seek(eof)
+    expected = b"\x00" * (skpnt - eof) + wstr
+    assert m.read(len(expected)) == expected
+    m.tell()
+
+    m.seek(0)
+    assert m.read() == fc + expected
+
+    m.truncate(skpnt)
+    assert m.tell() == skpnt + len(wstr)
+
+    # Extend with truncate() instead of writing the zeros, and read back
+    # the tail, then the whole file.
+    end = skpnt + 2 * len(wstr)
+    m.truncate(end)
+    m.seek(0)
+    assert m.read() == fc + b"\x00" * (end - eof)
+    m.seek(end)
+    m.write(wstr)
+    m.seek(skpnt)
+    assert m.read(3 * len(wstr)) == b"\x00" * (2 * len(wstr)) + wstr
+    m.seek(0)
+    assert m.read() == fc + b"\x00" * (end - eof) + wstr
 
-    xfile.seek(skpnt), pfile.seek(skpnt)
-    assert xfile.tell() == pfile.tell()
-    assert xfile.read() == pfile.read().encode()
-    assert xfile.tell() == pfile.tell()
-    assert xfile.tell() == skpnt
-
-    xfile.write(wstr), pfile.write(wstr)
-    assert xfile.tell() == pfile.tell()
-    xfile.seek(eof), pfile.seek(eof)
-    expected = "\x00" * (skpnt - eof) + wstr
-    assert xfile.read() == pfile.read().encode() == expected.encode()
-    assert xfile.tell() == pfile.tell()
-
-    xfile.seek(0), pfile.seek(0)
-    assert xfile.read() == pfile.read().encode()
-
-    xfile.truncate(skpnt), pfile.truncate(skpnt)
-    assert xfile.tell() == pfile.tell() == skpnt + len(wstr)
-
-    xfile.write(wstr), pfile.write(wstr)
-    expected = fc + "\x00" * (skpnt - eof + len(wstr)) + wstr
-    xfile.seek(0), pfile.seek(0)
-    assert xfile.read() == pfile.read().encode() == expected.encode()
+    xfile.close(), pfile.close()
 
 
-def test_read_binary(tmppath):
+def test_read_binary(bin_file):
     """Tests reading binary data from an existing file."""
-    fd = get_bin_testfile(tmppath)
-    fb = get_copy_file(fd, binary=True)
-    fp, fc = fd["full_path"], fd["contents"]
-    fp2 = fb["full_path"]
-
-    pfile = open(fp2, "rb")
-    xfile = XRootDPyFile(mkurl(fp), "rb")
-
-    assert xfile.read() == pfile.read() == fc
+    xfile = XRootDPyFile(bin_file["url"], "rb")
+    assert xfile.read() == bin_file["contents"]
 
 
-def test_write_binary(tmppath):
+def test_write_binary(tmppath, bin_file):
     """Tests for writing binary data to file."""
-    fd = get_bin_testfile(tmppath)
-    fp, fc = fd["full_path"], fd["contents"]
+    fc = bin_file["contents"]
 
     # Test w/ confirmed binary data read from a binary file
     xf_new = XRootDPyFile(mkurl(join(tmppath, "data/tmp_bin")), "wb+")
@@ -987,36 +1307,37 @@ def test_write_binary(tmppath):
     xf_new.close()
 
 
-def test_readline(tmppath):
+def test_readline(mltl_file):
     """Tests for readline()."""
-    fd = get_mltl_file(tmppath)
-    fb = get_copy_file(fd)
-    fp, fc = fd["full_path"], fd["contents"]
+    fd = mltl_file
+    url, fc = fd["url"], fd["contents"]
+    lines = fc.splitlines(True)
 
-    osfs = open_fs(fs.path.dirname(fd["full_path"]))
-    xfile, pfile = XRootDPyFile(mkurl(fp), "r"), osfs.open(fb["filename"], "r")
+    # One read, split locally, instead of one round trip per line.
+    xfile = XRootDPyFile(url, "r")
+    assert xfile.read().splitlines(True) == lines
 
-    assert xfile.readline() == pfile.readline().encode()
-    assert xfile.readline() == pfile.readline().encode()
-    assert xfile.readline() == pfile.readline().encode()
+    xfile.seek(0)
+    assert list(islice(xfile, 3)) == lines[:3]
 
-    xfile.close(), pfile.close()
-    xfile, pfile = XRootDPyFile(mkurl(fp), "r"), osfs.open(fb["filename"], "r")
-    assert xfile.readline() == pfile.readline().encode()
-    xfile.seek(0), pfile.seek(0)
-    assert xfile.readline() == pfile.readline().encode()
-    assert xfile.tell(), pfile.tell()
+    xfile.seek(0)
+    assert xfile.readline() == lines[0]
+    xfile.seek(0)
+    assert xfile.readline() == lines[0]
+    xfile.close()
 
-    xfile.close(), pfile.close()
-    xfile = XRootDPyFile(mkurl(fp), "w+")
 
-    str1 = "hello\n"
-    str2 = "bye\n"
+def test_readline_boundaries(tmppath):
+    """Tests readline() at EOF, past EOF and across sparse regions."""
+    url = mkurl(join(tmppath, "data/lines.txt"))
+    str1 = b"hello\n"
+    str2 = b"bye\n"
 
+    xfile = XRootDPyFile(url, "w+")
     xfile.write(str1 + str2)
     xfile.seek(0)
-    assert xfile.readline() == str1.encode()
-    assert xfile.readline() == str2.encode()
+    assert xfile.readline() == str1
+    assert xfile.readline() == str2
     assert xfile.readline() == b""
     assert xfile.readline() == b""
 
@@ -1024,25 +1345,40 @@ def test_readline(tmppath):
     assert xfile.readline() == b""
 
     xfile.close()
-    xfile = XRootDPyFile(mkurl(fp), "w+")
+    xfile = XRootDPyFile(url, "w+")
 
     xfile.write(str2)
     xfile.seek(len(str2) + 1)
     xfile.write(str2)
     xfile.seek(0)
-    _value = "\x00" + str2
-    assert xfile.readline() == str2.encode()
-    assert xfile.readline() == _value.encode()
+    assert xfile.readline() == str2
+    assert xfile.readline() == b"\x00" + str2
+    xfile.close()
 
+    # No trailing newline: the last line is returned once, then EOF.
+    xfile = XRootDPyFile(url, "w+", buffer_size=4)
+    xfile.write(str1 + b"bye")
+    xfile.seek(0)
+    assert list(xfile) == [str1, b"bye"]
+    assert xfile.readline() == b""
 
-def test_flush(tmppath):
+    # A seek back to where the last chunk ended must not reuse it.
+    xfile.seek(0)
+    assert xfile.readline() == str1
+    pos = xfile.tell()
+    xfile.seek(0)
+    xfile.seek(pos)
+    assert xfile.readline() == (str1 + b"bye")[pos:]
+
+
+def test_flush(tsta_file):
     """Tests for flush()"""
     # Mostly it just ensures calling it doesn't crash the program.
-    fd = get_tsta_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
-    xfile = XRootDPyFile(mkurl(full_path), "w")
+    fd = tsta_file
+    url, fc = fd["url"], fd["contents"]
+    xfile = XRootDPyFile(url, "w")
 
-    writestr = "whut"
+    writestr = b"whut"
 
     xfile.flush()
     xfile.seek(0, Seek.end)
@@ -1050,80 +1386,92 @@ def test_flush(tmppath):
     xfile.flush()
     xfile.close()
 
-    xfile = XRootDPyFile(mkurl(full_path), "r")
-    assert xfile.read() == writestr.encode()
+    xfile = XRootDPyFile(url, "r")
+    assert xfile.read() == writestr
 
     # Fake/mock an error response
-    fake_status = {
-        "status": 3,
-        "code": 0,
-        "ok": False,
-        "errno": errno.EREMOTE,
-        "error": True,
-        "message": "[FATAL] Remote I/O Error",
-        "fatal": True,
-        "shellcode": 51,
-    }
     # Assign mock return value to the file's sync() function
     # (which is called by flush())
-    xfile._file.sync = Mock(return_value=(XRootDStatus(fake_status), None))
-    pytest.raises(IOError, xfile.flush)
+    xfile._file.sync = _fake_error
+    with pytest.raises(IOError):
+        xfile.flush()
 
 
-def test__assert_mode(tmppath):
+def test__assert_mode(tsta_file):
     """Tests for _assert_mode"""
-    fd = get_tsta_file(tmppath)
-    full_path, fc = fd["full_path"], fd["contents"]
+    fd = tsta_file
+    url, fc = fd["url"], fd["contents"]
     mode = "r"
-    xfile = XRootDPyFile(mkurl(full_path), mode)
+    xfile = XRootDPyFile(url, mode)
 
     assert xfile.mode == mode
     assert xfile._assert_mode(mode)
     delattr(xfile, "mode")
-    pytest.raises(AttributeError, xfile._assert_mode, mode)
+    with pytest.raises(AttributeError):
+        xfile._assert_mode(mode)
 
     xfile.close()
-    xfile = XRootDPyFile(mkurl(full_path), "r")
+    xfile = XRootDPyFile(url, "r")
     assert xfile._assert_mode("r")
-    pytest.raises(IOError, xfile._assert_mode, "w")
+    with pytest.raises(IOError):
+        xfile._assert_mode("w")
 
     xfile.close()
-    xfile = XRootDPyFile(mkurl(full_path), "w-")
+    xfile = XRootDPyFile(url, "w-")
     assert xfile._assert_mode("w-")
-    pytest.raises(IOError, xfile._assert_mode, "r")
+    with pytest.raises(IOError):
+        xfile._assert_mode("r")
 
     xfile.close()
-    xfile = XRootDPyFile(mkurl(full_path), "a")
+    xfile = XRootDPyFile(url, "a")
     assert xfile._assert_mode("w")
-    pytest.raises(IOError, xfile._assert_mode, "r")
+    with pytest.raises(IOError):
+        xfile._assert_mode("r")
 
 
-def test_readlines(tmppath):
+def test_readlines(mltl_file, monkeypatch):
     """Tests readlines()"""
-    fd = get_mltl_file(tmppath)
+    fd = mltl_file
     fb = get_copy_file(fd)
-    fp, fc = fd["full_path"], fd["contents"]
+    url, fc = fd["url"], fd["contents"]
 
-    osfs = open_fs(fs.path.dirname(fb["full_path"]))
-    xfile, pfile = XRootDPyFile(mkurl(fp), "r"), osfs.open(fb["filename"], "r")
+    xfile, pfile = XRootDPyFile(url, "r"), open(fb["full_path"], "rb")
 
     xfile.seek(0), pfile.seek(0)
-    expected = _list_str_encode(pfile.readlines())
+    expected = pfile.readlines()
+    assert xfile.readlines() == expected
+
+    # Lines already buffered by readline() are not lost.
+    xfile.seek(0)
+    assert [xfile.readline()] + xfile.readlines() == expected
+    xfile.seek(0)
+    xfile.buffer_size = 4
+    assert [xfile.readline()] + xfile.readlines() == expected
+
+    # Large files are split chunk by chunk.
+    monkeypatch.setattr(xrdfile, "MAX_BULK_READ", 10)
+    monkeypatch.setattr(xrdfile, "BULK_CHUNK_SIZE", 7)
+    xfile.seek(0)
     assert xfile.readlines() == expected
+    xfile.seek(0)
+    assert [xfile.readline()] + xfile.readlines() == expected
 
     xfile.close(), pfile.close()
 
-    xfile, pfile = XRootDPyFile(mkurl(fp), "w+"), osfs.open(fb["filename"], "w+")
+    xfile, pfile = XRootDPyFile(url, "w+"), open(fb["full_path"], "wb+")
     xfile.seek(0), pfile.seek(0)
-    expected = _list_str_encode(pfile.readlines())
+    expected = pfile.readlines()
     assert xfile.readlines() == expected
+    xfile.close(), pfile.close()
+    pytest.raises(ValueError, xfile.readlines)
+
+    xfile = XRootDPyFile(url, "w")
+    pytest.raises(IOError, xfile.readlines)
 
 
 def test_xreadlines(tmppath):
     """Tests xreadlines()"""
-    fp = get_mltl_file(tmppath)["full_path"]
-
-    xfile = XRootDPyFile(mkurl(fp), "r")
+    xfile = XRootDPyFile(get_mltl_file(tmppath)["url"], "r")
 
     rl = xfile.readlines()
     xfile.seek(0)
@@ -1131,12 +1479,46 @@ def test_xreadlines(tmppath):
     assert xl != rl
     assert list(xl) == rl
 
+    # Continues after lines already returned by readline().
+    xfile.seek(0)
+    xfile.buffer_size = 4
+    assert [xfile.readline()] + list(xfile.xreadlines()) == rl
+
+    # The file stays usable after stopping early.
+    fb = get_mltl_file(tmppath)
+    xfile, pfile = XRootDPyFile(fb["url"], "r"), open(fb["full_path"], "rb")
+    xl = xfile.xreadlines()
+    assert [next(xl), next(xl)] == [pfile.readline(), pfile.readline()]
+    assert xfile.tell() == pfile.tell()
+    assert xfile.readline() == pfile.readline()
+    xl.close()
+    assert xfile.readline() == pfile.readline()
+    xfile.close(), pfile.close()
+
+    # Seeking while iterating continues from the new position.
+    xfile = XRootDPyFile(fb["url"], "w+")
+    xfile.write(b"l1\nl2\nl3\nl4\n")
+    xfile.seek(0)
+    lines = []
+    for line in xfile.xreadlines():
+        lines.append(line)
+        if line == b"l1\n":
+            xfile.seek(9)
+    assert lines == [b"l1\n", b"l4\n"]
+
+    # So does reading while iterating.
+    xfile.seek(0)
+    xl = xfile.xreadlines()
+    assert next(xl) == b"l1\n"
+    assert xfile.readline() == b"l2\n"
+    assert list(xl) == [b"l3\n", b"l4\n"]
+    xfile.close()
+
 
 def test_fileno(tmppath):
     """Test fileno."""
-    pytest.raises(
-        IOError, XRootDPyFile(mkurl(join(tmppath, "data/testa.txt")), "r-").fileno
-    )
+    with pytest.raises(IOError):
+        XRootDPyFile(mkurl(join(tmppath, "data/testa.txt")), "r-").fileno()
 
 
 def test_name(tmppath):
@@ -1154,9 +1536,25 @@ def test_writelines(tmppath):
     xfile = XRootDPyFile(mkurl(join(tmppath, "data/multiline.txt")), "r")
     yfile = XRootDPyFile(mkurl(join(tmppath, "data/newfile.txt")), "w+")
     yfile.writelines(xfile.xreadlines())
+    assert xfile.digest() == yfile.digest()
     xfile.seek(0), yfile.seek(0)
     assert xfile.readlines() == yfile.readlines()
 
+    # Lines are coalesced into a single write request.
+    yfile._file.write = Mock(wraps=yfile._file.write)
+    yfile.seek(0)
+    yfile.writelines(["a\n", b"b\n", bytearray(b"c\n")])
+    assert yfile._file.write.call_count == 1
+    yfile.seek(0)
+    assert yfile.read(6) == b"a\nb\nc\n"
+
+    # Also when the lines come from a generator.
+    yfile.seek(0)
+    yfile.writelines(line for line in ["d\n", b"e\n", bytearray(b"f\n")])
+    assert yfile._file.write.call_count == 2
+    yfile.seek(0)
+    assert yfile.read(6) == b"d\ne\nf\n"
+
 
 def test_seekable(tmppath):
     """Test seekable."""
@@ -1200,16 +1598,60 @@ def test_iterator_buffering(tmppath):
     "Test file iteration."
     f = "data/multiline.txt"
     xfile = XRootDPyFile(mkurl(join(tmppath, f)), "r")
-    assert len(list(iter(xfile))) == len(open(join(tmppath, f)).readlines())
+    assert len(list(iter(xfile))) == len(open(join(tmppath, f), "rb").readlines())
     xfile = XRootDPyFile(mkurl(join(tmppath, f)), "r", buffering=10)
-    assert len(list(iter(xfile))) == int(math.ceil(xfile.size / 10.0))
+    assert len(list(iter(xfile))) == -(-xfile.size // 10)
 
 
-def remove_file(tmppath, file):
-    from XRootD import client
+def test_iterator_pipelined(mltl_file):
+    """Test chunked iteration with several reads in flight."""
+    fd = mltl_file
+    url, fc = fd["url"], fd["contents"]
 
-    myclient = client.FileSystem(tmppath)
-    myclient.rm(file)
+    xfile = XRootDPyFile(url, "rb", buffering=7)
+    assert b"".join(xfile) == fc
+    assert xfile.tell() == len(fc)
+
+    # Seeking while iterating restarts the requests at the new position.
+    xfile.seek(3)
+    it = iter(xfile)
+    assert next(it) == fc[3:10]
+    xfile.seek(1)
+    assert next(it) == fc[1:8]
+    assert b"".join(it) == fc[8:]
+
+    # Iterated files are freed, and thus closed, without the cyclic GC.
+    xfile = XRootDPyFile(url, "rb", buffering=7)
+    assert b"".join(xfile) == fc
+    ref = weakref.ref(xfile)
+    gc.disable()
+    try:
+        del xfile
+        assert ref() is None
+    finally:
+        gc.enable()
+
+    # Closing stops the iteration.
+    xfile = XRootDPyFile(url, "rb", buffering=7)
+    it = iter(xfile)
+    assert next(it) == fc[:7]
+    xfile.close()
+    pytest.raises(ValueError, next, it)
+
+    # Chunks are fetched in blocks of up to buffer_size bytes.
+    xfile = XRootDPyFile(url, "rb", buffering=7, buffer_size=30)
+    xfile._file.read = Mock(wraps=xfile._file.read)
+    assert b"".join(xfile) == fc
+    sizes = [c.kwargs["size"] for c in xfile._file.read.call_args_list]
+    assert sizes == [28] * -(-len(fc) // 28)
+
+    # Read-write files are iterated with plain reads.
+    xfile = XRootDPyFile(url, "r+b", buffering=7)
+    assert b"".join(xfile) == fc
+
+
+def remove_file(client, tmppath, file):
+    client.rm(join(tmppath, file))
 
 
 def create_big_file(
@@ -1220,23 +1662,22 @@ def create_big_file(
     endfile_content=None,
 ):
     xfile = XRootDPyFile(mkurl(join(tmppath, filename)), "w")
-    if endfile_content:
-        endfile_length = len(endfile_content)
-    else:
-        endfile_content = "\0"
-        endfile_length = 1
-    # Prepare big file for testing
+    # Prepare big file for testing; truncate() leaves a sparse file without
+    # sending any data.
+    xfile.truncate(size)
     if frontfile_content:
         xfile.write(frontfile_content)
-    xfile.seek(size - endfile_length)
-    xfile.write(endfile_content)
+    if endfile_content:
+        xfile.seek(size - len(endfile_content))
+        xfile.write(endfile_content)
     xfile.close()
 
 
-def test_reading_end_of_big_file(tmppath):
+@pytest.mark.xrootd_server
+def test_reading_end_of_big_file(tmppath, xrd_client):
     """Tests reading end of big file."""
     f = "data/big_file.txt"
-    create_big_file(tmppath, f, endfile_content="test\0")
+    create_big_file(tmppath, f, endfile_content=b"test\0")
 
     xfile = XRootDPyFile(mkurl(join(tmppath, f)), "r")
 
@@ -1247,26 +1688,29 @@ def test_reading_end_of_big_file(tmppath):
     assert data[-5:-1] == b"test"
     xfile.close()
 
-    remove_file(tmppath, f)
+    remove_file(xrd_client, tmppath, f)
 
 
-def test_reading_whole_big_file(tmppath):
+@pytest.mark.xrootd_server
+def test_reading_whole_big_file(tmppath, xrd_client):
     """Tests reading end of big file."""
     f = "data/big_file.txt"
     create_big_file(tmppath, f)
 
     xfile = XRootDPyFile(mkurl(join(tmppath, f)), "r")
 
-    pytest.raises(IOError, xfile.read)
+    with pytest.raises(IOError):
+        xfile.read()
     xfile.close()
 
-    remove_file(tmppath, f)
+    remove_file(xrd_client, tmppath, f)
 
 
-def test_reading_begining_of_big_file(tmppath):
+@pytest.mark.xrootd_server
+def test_reading_begining_of_big_file(tmppath, xrd_client):
     """Tests reading end of big file."""
     f = "data/big_file.txt"
-    create_big_file(tmppath, f, frontfile_content="test")
+    create_big_file(tmppath, f, frontfile_content=b"test")
 
     xfile = XRootDPyFile(mkurl(join(tmppath, f)), "r")
 
@@ -1274,4 +1718,4 @@ def test_reading_begining_of_big_file(tmppath):
     assert data == b"test"
     xfile.close()
 
-    remove_file(tmppath, f)
+    remove_file(xrd_client, tmppath, f)
@@ -15,11 +15,13 @@ from conftest import mkurl
 from XRootD import client as xclient
 from XRootD.client.flags import OpenFlags
 
+pytestmark = pytest.mark.xrootd_server
+
 
 # If "test" is in its name then pytest picks it up.
 def tstfile_a(p):
     fname = "data/testa.txt"
-    with open(join(p, fname)) as f:
+    with open(join(p, fname), "rb") as f:
         fconts = f.read()
 
     return fname, fconts
@@ -34,7 +36,7 @@ def test_READ(tmppath):
 
     # Can we read?
     statmsg, content = xf.read()
-    assert content == fconts.encode()
+    assert content == fconts
     assert statmsg.ok
 
     # Can we write?
@@ -61,7 +63,7 @@ def test_APPEND(tmppath):
 
     # Can we read?
     statmsg, content = xf.read()
-    assert content == fconts.encode()
+    assert content == fconts
     assert statmsg.ok
 
     # Can we write?
@@ -81,7 +83,7 @@ def test_UPDATE(tmppath):
 
     # Can we read?
     statmsg, content = xf.read()
-    assert content == fconts.encode()
+    assert content == fconts
     assert statmsg.ok
 
     # Can we write?
@@ -129,10 +131,10 @@ def test_DELETE(tmppath):
     assert res == b""
 
     # Can we write now?
-    newc = "whaat"
+    newc = b"whaat"
     statmsg, res = xf.write(newc)
     print((statmsg, res))
     assert statmsg.ok
     assert not statmsg.error
-    assert xf.read()[1] == newc.encode()
+    assert xf.read()[1] == newc
     print(xf.read())
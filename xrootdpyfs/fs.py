@@ -18,8 +18,12 @@ implements the entire PyFilesystem
    XRootDPyFS and not supported by other PyFilesystem implementations.
 """
 
+import fnmatch
 import re
-from glob import fnmatch
+from collections import deque
+from functools import lru_cache
+from queue import Queue
+from time import monotonic
 
 from fs import ResourceType
 from fs.base import FS
@@ -27,6 +31,7 @@ from fs.errors import (
     DestinationExists,
     DirectoryNotEmpty,
     FSError,
+    IllegalBackReference,
     InvalidPath,
     RemoteConnectionError,
     ResourceError,
@@ -49,6 +54,56 @@ from XRootD.client.flags import (
 from .utils import is_valid_path, is_valid_url, spliturl
 from .xrdfile import XRootDPyFile
 
+#: Maximum number of entries kept in the stat cache of a file system.
+STAT_CACHE_SIZE = 1024
+
+#: Number of requests kept in flight by ``ilistdir_many()``,
+#: ``walkfiles_bulk()``, ``bulk_stat()`` and ``bulk_remove()``.
+REQUEST_PIPELINE_DEPTH = 16
+
+#: Errors raised for XRootD error numbers, as ``(suffix, matched, other)``:
+#: ``matched`` if the error message ends with ``suffix``, else ``other``.
+_ERRNO_ERRORS = {
+    # 3006 - legacy (v4 errno), 17 - POSIX error, 3018 (xrootd v5 errno)
+    3006: ("directory not empty", DirectoryNotEmpty, DestinationExists),
+    17: ("directory not empty", DirectoryNotEmpty, DestinationExists),
+    3018: ("directory not empty", DirectoryNotEmpty, DestinationExists),
+    # Unfortunately only way to determine if the error is due to a
+    # directory not being empty, or that a resource is not a directory:
+    3005: ("not a directory", ResourceInvalid, DirectoryNotEmpty),
+    3011: (None, None, ResourceNotFound),
+}
+
+#: Stat flags of a directory, and of anything that is not a regular file.
+_IS_DIR = StatInfoFlags.IS_DIR
+_NOT_FILE = StatInfoFlags.IS_DIR | StatInfoFlags.OTHER
+
+#: Matches paths that are absolute or need normalizing before being joined.
+_needs_normpath = re.compile(r"^/|//|/$|(?:^|/)\.\.?(?:/|$)").search
+
+
+@lru_cache(maxsize=1024)
+def _join_base_path(base_path, path):
+    """Prepend a base path to a path (memoized, paths repeat a lot)."""
+    # fs.path.join() omits the first '/' in base_path.
+    # It is resolved by adding on an additional '/' to its return value.
+    _path = path
+    if isabs(path):
+        no_trailing = base_path[:-1]
+        one_slash = no_trailing[1:]
+        missing_basepath = not (
+            path.startswith(one_slash) or path.startswith(no_trailing)
+        )
+        if missing_basepath:
+            _path = relpath(path)
+    return "/" + join(base_path, _path)
+
+
+@lru_cache(maxsize=256)
+def _compile_wildcard(wildcard):
+    """Get a match function for a wildcard (compiled once per pattern)."""
+    return re.compile(fnmatch.translate(wildcard)).match
+
 
 class XRootDPyFS(FS):
     """XRootD PyFilesystem interface.
@@ -80,6 +135,13 @@ class XRootDPyFS(FS):
         The contents of the dictionary gets merged with any querystring
         provided in the ``url``.
     :type query: dict
+    :param stat_cache_ttl: Number of seconds stat results are reused for by
+        ``getinfo()``, ``isdir()``, ``isfile()`` and ``exists()``. Mutating
+        operations done through this object invalidate the affected entries
+        and their parent directories, but changes made by other clients (or
+        through already opened files) are only seen once an entry expires.
+        Defaults to ``0`` which disables the cache.
+    :type stat_cache_ttl: float
     """
 
     # https://xrootd.slac.stanford.edu/doc/dev52/ofs_config.htm#_Toc53410373
@@ -95,7 +157,7 @@ class XRootDPyFS(FS):
         "supports_rename": True,
     }
 
-    def __init__(self, url, query=None):
+    def __init__(self, url, query=None, stat_cache_ttl=0):
         """Initialize file system object."""
         if not is_valid_url(url):
             raise InvalidPath(path=url)
@@ -127,42 +189,69 @@ class XRootDPyFS(FS):
         self.root_url = root_url
         self.base_path = base_path
         self.queryargs = queryargs
+        try:
+            # Prefix of the full path of a plain relative path, see _p().
+            self._path_prefix = "/" + join(base_path, "_")[:-1]
+        except IllegalBackReference:
+            self._path_prefix = None
         self._client = FileSystem(self.xrd_get_rooturl())
+        self._stat_cache = {}
+        self._stat_cache_ttl = stat_cache_ttl
         super().__init__()
 
     def _p(self, path, encoding="utf-8"):
         """Prepend base path to path."""
-        # fs.path.join() omits the first '/' in self.base_path.
-        # It is resolved by adding on an additional '/' to its return value.
-        _path = path
-        if isabs(path):
-            no_trailing = self.base_path[:-1]
-            one_slash = no_trailing[1:]
-            missing_basepath = not (
-                path.startswith(one_slash) or path.startswith(no_trailing)
-            )
-            if missing_basepath:
-                _path = relpath(path)
-        return "/" + join(self.base_path, _path)
+        if path and self._path_prefix is not None and not _needs_normpath(path):
+            return self._path_prefix + path
+        return _join_base_path(self.base_path, path)
 
     def _raise_status(self, path, status):
         """Raise error based on status."""
-        # 3006 - legacy (v4 errno), 17 - POSIX error, 3018 (xrootd v5 errno)
-        if status.errno in [3006, 17, 3018]:
-            if status.message.strip().endswith("directory not empty"):
-                raise DirectoryNotEmpty(path=path, msg=status)
-            raise DestinationExists(path=path, msg=status)
-        elif status.errno in [3005]:
-            # Unfortunately only way to determine if the error is due to a
-            # directory not being empty, or that a resource is not a directory:
-            if status.message.strip().endswith("not a directory"):
-                raise ResourceInvalid(path=path, msg=status)
-            else:
-                raise DirectoryNotEmpty(path=path, msg=status)
-        elif status.errno == 3011:
-            raise ResourceNotFound(path=path, msg=status)
-        else:
-            raise ResourceError(path=path, msg=status)
+        suffix, matched, exc = _ERRNO_ERRORS.get(
+            status.errno, (None, None, ResourceError)
+        )
+        if suffix is not None and status.message.strip().endswith(suffix):
+            exc = matched
+        raise exc(path=path, msg=status)
+
+    def _cached_stat(self, path):
+        """Stat a path, reusing a fresh result from the stat cache."""
+        fullpath = self._p(path)
+        cache = self._stat_cache
+        now = monotonic()
+        if self._stat_cache_ttl > 0:
+            entry = cache.get(fullpath)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+        status, statobj = self._client.stat(fullpath)
+        if not status.ok:
+            cache.pop(fullpath, None)
+            self._raise_status(path, status)
+
+        self._store_stat(fullpath, statobj, now)
+        return statobj
+
+    def _store_stat(self, fullpath, statobj, now):
+        """Keep a stat result requested at time ``now`` in the stat cache."""
+        if self._stat_cache_ttl <= 0:
+            return
+        cache = self._stat_cache
+        if len(cache) >= STAT_CACHE_SIZE:
+            for key in [k for k, (expiry, _) in cache.items() if expiry <= now]:
+                del cache[key]
+            if len(cache) >= STAT_CACHE_SIZE:
+                del cache[next(iter(cache))]
+        cache[fullpath] = (now + self._stat_cache_ttl, statobj)
+
+    def _invalidate_stat(self, *paths):
+        """Drop cached stat results for paths and their parent directories."""
+        if not self._stat_cache:
+            return
+        for path in paths:
+            fullpath = self._p(path)
+            self._stat_cache.pop(fullpath, None)
+            self._stat_cache.pop(dirname(fullpath), None)
 
     def _query(self, flag, arg, parse=True):
         """Query an xrootd server."""
@@ -219,6 +308,8 @@ class XRootDPyFS(FS):
             is an file.
         :raises: `fs.errors.ResourceNotFound` if the path is not found.
         """
+        if mode.strip("rbt"):
+            self._invalidate_stat(path)
         return XRootDPyFile(
             self.getpathurl(path, with_querystring=True),
             mode=mode,
@@ -264,24 +355,28 @@ class XRootDPyFS(FS):
             not a directory.
         :raises: `fs.errors.ResourceNotFound` if the path is not found.
         """
-        return list(
-            self.ilistdir(
-                path=path,
-                wildcard=wildcard,
-                full=full,
-                absolute=absolute,
-                dirs_only=dirs_only,
-                files_only=files_only,
-            )
+        return self._ilistdir_helper(
+            path,
+            self._dirlist(path, stat=dirs_only or files_only),
+            wildcard=wildcard,
+            full=full,
+            absolute=absolute,
+            dirs_only=dirs_only,
+            files_only=files_only,
         )
 
-    def _stat_flags(self, path):
-        """Get status of a path."""
-        status, stat = self._client.stat(self._p(path))
+    def _dirlist(self, path, stat=False):
+        """List the entries of a directory, with their stat info if ``stat``."""
+        flag = DirListFlags.STAT if stat else DirListFlags.NONE
+        status, entries = self._client.dirlist(self._p(path), flag)
 
         if not status.ok:
-            raise self._raise_status(path, status)
-        return stat.flags
+            self._raise_status(path, status)
+        return entries
+
+    def _stat_flags(self, path):
+        """Get status of a path."""
+        return self._cached_stat(path).flags
 
     def isdir(self, path, _statobj=None):
         """Check if a path references a directory.
@@ -294,7 +389,7 @@ class XRootDPyFS(FS):
         """
         try:
             flags = self._stat_flags(path) if _statobj is None else _statobj.flags
-            return bool(flags & StatInfoFlags.IS_DIR)
+            return bool(flags & _IS_DIR)
         except ResourceNotFound:
             return False
 
@@ -309,7 +404,7 @@ class XRootDPyFS(FS):
         """
         try:
             flags = self._stat_flags(path) if _statobj is None else _statobj.flags
-            return not bool(flags & (StatInfoFlags.IS_DIR | StatInfoFlags.OTHER))
+            return not bool(flags & _NOT_FILE)
         except ResourceNotFound:
             return False
 
@@ -320,8 +415,11 @@ class XRootDPyFS(FS):
         :type path: str
         :rtype: bool
         """
-        status, stat = self._client.stat(self._p(path))
-        return status.ok
+        try:
+            self._cached_stat(path)
+        except FSError:
+            return False
+        return True
 
     def makedir(
         self,
@@ -352,6 +450,7 @@ class XRootDPyFS(FS):
         mode = AccessMode.NONE
 
         status, _ = self._client.mkdir(self._p(path), flags=flags, mode=mode)
+        self._invalidate_stat(path)
 
         if not status.ok:
             # 3018 introduced in xrootd5, 17 = POSIX error, 3006 - legacy errno
@@ -376,6 +475,7 @@ class XRootDPyFS(FS):
             empty.
         """
         status, res = self._client.rm(self._p(path))
+        self._invalidate_stat(path)
 
         if not status.ok:
             self._raise_status(path, status)
@@ -405,6 +505,7 @@ class XRootDPyFS(FS):
             raise Unsupported("recursive parameter is not supported.")
 
         status, _ = self._client.rmdir(self._p(path))
+        self._invalidate_stat(path)
 
         if not status.ok:
             directory_not_empty_error = status.errno in [3005, 3018]
@@ -415,9 +516,11 @@ class XRootDPyFS(FS):
                     for file in step.files:
                         filepath = join(step.path, file.name)
                         status, _ = self._client.rm(self._p(filepath))
+                        self._invalidate_stat(filepath)
                         if not status.ok:
                             self._raise_status(filepath, status)
                     status, _ = self._client.rmdir(self._p(step.path))
+                    self._invalidate_stat(step.path)
                     if not status.ok:
                         self._raise_status(path, status)
                 return True
@@ -482,10 +585,7 @@ class XRootDPyFS(FS):
         """
         namespaces = namespaces or ()
         fullpath = self._p(path)
-        status, statobj = self._client.stat(fullpath)
-
-        if not status.ok:
-            self._raise_status(path, status)
+        statobj = self._cached_stat(path)
 
         extended_attr = self._query(QueryCode.XATTR, fullpath)
 
@@ -564,23 +664,161 @@ class XRootDPyFS(FS):
         This method behaves identically to `fs.base:FS.listdir` but
         returns an generator instead of a list.
         """
-        flag = DirListFlags.STAT if dirs_only or files_only else DirListFlags.NONE
-
-        full_path = self._p(path)
-        status, entries = self._client.dirlist(full_path, flag)
-
-        if not status.ok:
-            self._raise_status(path, status)
-
-        return self._ilistdir_helper(
+        names = self._ilistdir_helper(
             path,
-            entries,
+            self._dirlist(path, stat=dirs_only or files_only),
             wildcard=wildcard,
             full=full,
             absolute=absolute,
             dirs_only=dirs_only,
             files_only=files_only,
         )
+        return (name for name in names)
+
+    def ilistdir_many(
+        self,
+        paths,
+        wildcard=None,
+        full=False,
+        absolute=False,
+        dirs_only=False,
+        files_only=False,
+    ):
+        """Generator listing several directories with pipelined requests.
+
+        Up to ``REQUEST_PIPELINE_DEPTH`` listings are requested at a time, so
+        walking a tree costs about one round trip per level instead of one
+        per directory. ``(path, entries)`` pairs are yielded in the order the
+        listings complete, ``entries`` being the list ``listdir()`` returns
+        for ``path`` with the same keyword arguments.
+        """
+        if dirs_only and files_only:
+            raise ValueError("dirs_only and files_only cannot both be True")
+        flag = DirListFlags.STAT if dirs_only or files_only else DirListFlags.NONE
+
+        listings = self._request_many(self._client.dirlist, deque(paths), flag)
+        for path, status, entries in listings:
+            if not status.ok:
+                self._raise_status(path, status)
+            yield path, self._ilistdir_helper(
+                path,
+                entries,
+                wildcard=wildcard,
+                full=full,
+                absolute=absolute,
+                dirs_only=dirs_only,
+                files_only=files_only,
+            )
+
+    def walkfiles_bulk(self, path="./"):
+        """Generator yielding the paths of all files below a directory.
+
+        Subdirectories are listed as soon as they are found, with up to
+        ``REQUEST_PIPELINE_DEPTH`` listings in flight, instead of one
+        ``listdir()`` round trip after the other. Paths are relative to the
+        base path, as with ``listdir(full=True)``, and come in no particular
+        order.
+
+        The XRootD client handles all responses on a single event loop
+        thread by default. For large trees, setting the environment variable
+        ``XRD_PARALLELEVTLOOP`` (e.g. to ``4``) before the client is
+        created lets it process them in parallel.
+        """
+        is_dir, not_file = _IS_DIR, _NOT_FILE
+
+        dirs = deque([normpath(path)])
+        listings = self._request_many(self._client.dirlist, dirs, DirListFlags.STAT)
+        for dirpath, status, entries in listings:
+            if not status.ok:
+                self._raise_status(dirpath, status)
+            for p in entries:
+                flags = p.statinfo.flags
+                if flags & is_dir:
+                    dirs.append(combine(dirpath, p.name))
+                elif not flags & not_file:
+                    yield combine(dirpath, p.name)
+
+    def bulk_stat(self, paths):
+        """Stat several paths with pipelined requests.
+
+        Up to ``REQUEST_PIPELINE_DEPTH`` stat requests are in flight at a
+        time. The results are kept in the stat cache if it is enabled.
+
+        :param paths: Paths to stat.
+        :returns: List of XRootD ``StatInfo`` objects, in the order of
+            ``paths``.
+        :raises: The error of the first path (in the order of ``paths``)
+            that could not be stat'ed, once all requests have completed.
+        """
+        paths = list(paths)
+        results = {}
+        now = monotonic()
+        for path, status, statobj in self._request_many(
+            self._client.stat, deque(paths)
+        ):
+            results[path] = (status, statobj)
+            if status.ok:
+                self._store_stat(self._p(path), statobj, now)
+            else:
+                self._stat_cache.pop(self._p(path), None)
+
+        for path in paths:
+            status, statobj = results[path]
+            if not status.ok:
+                self._raise_status(path, status)
+        return [results[path][1] for path in paths]
+
+    def bulk_remove(self, paths):
+        """Remove several files with pipelined requests.
+
+        Up to ``REQUEST_PIPELINE_DEPTH`` remove requests are in flight at a
+        time. All paths are tried, even if some of them fail.
+
+        :param paths: Paths of the files to remove.
+        :raises: The error of the first path (in the order of ``paths``)
+            that could not be removed, once all requests have completed.
+        """
+        paths = list(paths)
+        failed = {}
+        for path, status, _ in self._request_many(self._client.rm, deque(paths)):
+            self._invalidate_stat(path)
+            if not status.ok:
+                failed[path] = status
+
+        for path in paths:
+            if path in failed:
+                self._raise_status(path, failed[path])
+        return True
+
+    def _request_many(self, request, paths, *args):
+        """Generator sending ``request(fullpath, *args)`` for many paths.
+
+        Paths are taken from the deque ``paths`` and up to
+        ``REQUEST_PIPELINE_DEPTH`` requests are kept in flight through the
+        asynchronous client API. ``(path, status, response)`` tuples are
+        yielded as the requests complete. Paths appended to ``paths`` while
+        iterating are requested as well.
+        """
+        done = Queue()
+        inflight = 0
+        while True:
+            while paths and inflight < REQUEST_PIPELINE_DEPTH:
+                path = paths.popleft()
+
+                def callback(status, response, hostlist, path=path):
+                    done.put((path, status, response))
+
+                status = request(self._p(path), *args, callback=callback)
+                if status.ok:
+                    inflight += 1
+                else:
+                    yield path, status, None
+            if not inflight:
+                return
+
+            result = done.get()
+            inflight -= 1
+            yield result
 
     def _ilistdir_helper(
         self,
@@ -592,41 +830,48 @@ class XRootDPyFS(FS):
         dirs_only=False,
         files_only=False,
     ):
-        """A helper method called by ilistdir method that applies filtering.
+        """A helper method called by the listdir methods that applies filtering.
 
         Given the path to a directory and a list of the names of entries within
-        that directory, this method applies the semantics of the ilistdir()
+        that directory, this method applies the semantics of the listdir()
         keyword arguments. An appropriately modified and filtered list of
         directory entries is returned.
+
+        The list is built eagerly, one comprehension per step, as the whole
+        listing has already been received from the server.
         """
         path = normpath(path)
 
         if dirs_only and files_only:
             raise ValueError("dirs_only and files_only cannot both be True")
 
-        if wildcard is not None:
-            if not callable(wildcard):
-                wildcard_re = re.compile(fnmatch.translate(wildcard))
-
-                def wildcard(fn):
-                    return bool(wildcard_re.match(fn))
-
-            entries = (p for p in entries if wildcard(p.name))
-
+        # The entries were listed with DirListFlags.STAT; test their flags
+        # directly, as isdir() and isfile() do.
         if dirs_only:
-            entries = (p for p in entries if self.isdir(p.name, _statobj=p.statinfo))
+            is_dir = _IS_DIR
+            entries = [p for p in entries if p.statinfo.flags & is_dir]
         elif files_only:
-            entries = (p for p in entries if self.isfile(p.name, _statobj=p.statinfo))
+            not_file = _NOT_FILE
+            entries = [p for p in entries if not p.statinfo.flags & not_file]
 
-        if full:
-            entries = (combine(path, p.name) for p in entries)
-        elif absolute:
-            path = self._p(path)
-            entries = ((combine(path, p.name)) for p in entries)
-        else:
-            entries = (p.name for p in entries)
+        names = [p.name for p in entries]
+        if wildcard is not None:
+            if not callable(wildcard):
+                wildcard = _compile_wildcard(wildcard)
+            names = list(filter(wildcard, names))
+
+        if full or absolute:
+            if not full:
+                path = self._p(path)
+            if path:
+                # Entry names never contain a "/", so combine() comes down
+                # to prepending the directory.
+                prefix = path.rstrip("/") + "/"
+                names = [prefix + name for name in names]
+            else:
+                names = [combine(path, name) for name in names]
 
-        return entries
+        return names
 
     def move(self, src, dst, overwrite=False, **kwargs):
         """Move a file from one location to another.
@@ -707,6 +952,7 @@ class XRootDPyFS(FS):
                 self.removedir(dst, force=True)
 
         status, dummy = self._client.mv(src, dst)
+        self._invalidate_stat(src, dst)
 
         if not status.ok:
             self._raise_status(dst, status)
@@ -738,6 +984,7 @@ class XRootDPyFS(FS):
                 self.removedir(dst, force=True)
 
         status, dummy = self._client.copy(src, dst, force=overwrite)
+        self._invalidate_stat(dst)
 
         if not status.ok:
             self._raise_status(dst, status)
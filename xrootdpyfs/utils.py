@@ -9,35 +9,39 @@
 """Helper methods for working with root URLs."""
 
 import re
+from functools import lru_cache
 
 from six.moves.urllib.parse import urlparse
 from XRootD.client import URL
 from XRootD.client.flags import OpenFlags
 
+# Plain ``root://host//path`` URL without query string or fragment.
+_ROOT_URL_RE = re.compile(r"(roots?://[^][/?#\s]+)(/[^?#\s]*)?\Z")
 
+
+@lru_cache(maxsize=1024)
 def is_valid_url(fs_url):
     """Check if URL is a valid root URL."""
     scheme, netloc, path, params, query, fragment = urlparse(fs_url)
     return URL(fs_url).is_valid() and scheme in ["root", "roots"]
 
 
+@lru_cache(maxsize=1024)
 def is_valid_path(fs_path):
     """Check if path is a valid XRootD compatible path.
 
     Valid paths start with two slashes ('/'), i.e. '//';
     and do not contain any other two adjacent slashes.
     """
-    if len(fs_path) > 1:
-        if not re.search(r"^//", fs_path) or re.search(r"//", fs_path[1:]):
-            return False
-        else:
-            return True
-    else:
-        return False
+    return fs_path.startswith("//") and "//" not in fs_path[1:]
 
 
 def spliturl(fs_url):
     """Split XRootD URL in a host and path part."""
+    match = _ROOT_URL_RE.match(fs_url)
+    if match:
+        return match.group(1), match.group(2) or "", ""
+
     scheme, netloc, path, params, query, fragment = urlparse(fs_url)
 
     pattern = "{scheme}://{netloc}"
@@ -8,16 +8,98 @@
 
 """File-like interface for interacting with files over the XRootD protocol."""
 
+import atexit
+import hashlib
+import io
 import sys
+import threading
+from collections import deque, namedtuple
+from functools import lru_cache
 
 from fs import Seek
 from fs.errors import InvalidPath, PathError, ResourceNotFound, Unsupported
 from fs.path import basename
 from six import b, binary_type, text_type
-from XRootD.client import File
+from XRootD.client import File, FileSystem
+from XRootD.client.flags import OpenFlags, QueryCode
 
 from .utils import is_valid_path, is_valid_url, spliturl, translate_file_mode_to_flags
 
+#: Files (or remainders of files) up to this size are fetched by
+#: ``readlines()`` with a single read request.
+MAX_BULK_READ = 64 * 1024 * 1024
+
+#: Chunk size used by ``readlines()`` for files larger than ``MAX_BULK_READ``.
+BULK_CHUNK_SIZE = 4 * 1024 * 1024
+
+#: ``writelines()`` sends one write request per this many bytes.
+WRITELINES_BLOCK_SIZE = 4 * 1024 * 1024
+
+#: Bytes of already consumed data kept when the read-ahead buffer is refilled,
+#: so that small backward seeks are still served from memory.
+READ_AHEAD_BACKWARD = 256 * 1024
+
+#: Reads starting at most this many bytes past the end of the read-ahead
+#: buffer extend it (fetching the skipped bytes too) instead of replacing it.
+READ_AHEAD_FORWARD = 64 * 1024
+
+#: Maximum number of chunks in one vector read (XRootD's ``readv_iov_max``),
+#: used if the server does not report its own limit.
+READV_IOV_MAX = 1024
+
+#: Maximum size of a single vector read chunk (XRootD's ``readv_ior_max``),
+#: used if the server does not report its own limit.
+READV_IOR_MAX = 2097136
+
+#: ``read()`` requests larger than this are sent as vector reads, so that the
+#: server can fetch the chunks in parallel.
+VECTOR_READ_THRESHOLD = 4 * 1024 * 1024
+
+#: Chunk size used by ``digest()``.
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+#: Number of read requests kept in flight when iterating over a file opened
+#: for reading only.
+PIPELINE_DEPTH = 4
+
+#: Minimum size of the read requests sent by ``xreadlines()``.
+LINES_CHUNK_SIZE = 1024 * 1024
+
+
+#: Capability flags checked by ``XRootDPyFile._assert_mode()``.
+_CAN_READ, _CAN_WRITE, _CAN_SEEK = 1, 2, 4
+_CAN_ALL = _CAN_READ | _CAN_WRITE | _CAN_SEEK
+
+#: Capabilities of a file opened with a given mode string. ``caps`` is the
+#: bitmask of ``_CAN_*`` flags the file has, ``needs`` the flags an access
+#: with the mode string requires and ``flags`` the XRootD open flags.
+_ModeBits = namedtuple(
+    "_ModeBits",
+    ["readable", "writable", "seekable", "append", "caps", "needs", "flags"],
+)
+
+
+@lru_cache(maxsize=64)
+def _mode_bits(mode):
+    """Get the capabilities for a mode string (parsed once per string)."""
+    needs = _CAN_READ if "r" in mode else 0
+    if "w" in mode:
+        needs |= _CAN_WRITE
+    if "-" not in mode:
+        needs |= _CAN_SEEK
+    caps = needs | _CAN_WRITE if "a" in mode else needs
+    if "+" in mode:
+        caps = _CAN_ALL
+    return _ModeBits(
+        readable="r" in mode or "+" in mode,
+        writable="w" in mode or "+" in mode or "a" in mode,
+        seekable="-" not in mode,
+        append="a" in mode,
+        caps=caps,
+        needs=needs,
+        flags=translate_file_mode_to_flags(mode),
+    )
+
 
 class XRootDPyFile(object):
     r"""File-like interface for working with files over XRootD protocol.
@@ -52,6 +134,9 @@ class XRootDPyFile(object):
         Pass 0 to switch buffering off (only allowed in binary mode),
         1 to select line buffering (only usable in text mode), and
         an integer > 1 to indicate the size of a fixed-size chunk buffer.
+        Reads smaller than the chunk buffer (``buffer_size`` unless
+        ``buffering`` > 1) are served from a read-ahead buffer which is
+        filled with one request per chunk; ``buffering=0`` disables it.
     :param encoding: Determines encoding used when writing unicode data.
     :param errors: An optional string that specifies how encoding and
         decoding errors are to be handled (e.g. ``strict``, ``ignore`` or
@@ -63,6 +148,15 @@ class XRootDPyFile(object):
     :param buffer_size: Buffer size used when reading files (defaults to 64K).
         This can likely be optimized to chunks up to 2MB depending on your
         desired memory usage.
+    :param async_writes: If True, ``write()`` sends the data and returns
+        without waiting for the server. Outstanding writes are waited for
+        before reading, truncating, flushing and closing the file, and a
+        failed write is raised there instead of from ``write()``.
+    :param write_buffer_size: If > 0, consecutive writes are collected in a
+        buffer of this many bytes and sent with one request when it is full,
+        before the next non-contiguous write, and before reading, truncating,
+        flushing and closing the file. A failed write is raised from there.
+        Disabled by default.
     """
 
     def __init__(
@@ -75,6 +169,8 @@ class XRootDPyFile(object):
         newline=None,
         line_buffering=False,
         buffer_size=None,
+        async_writes=False,
+        write_buffer_size=0,
         **kwargs
     ):
         """The XRootDPyFile constructor.
@@ -102,6 +198,7 @@ class XRootDPyFile(object):
 
         # PyFS attributes
         self.mode = mode
+        self._mode_bits = _mode_bits(mode)
 
         # XRootD attributes & internals
         self.path = path
@@ -110,15 +207,36 @@ class XRootDPyFile(object):
         self.buffer_size = buffer_size or 64 * 1024
         self.buffering = buffering
         self._file = File()
+        self._closing = False
         self._ipp = 0
         self._size = -1
         self._iterator = None
         self._newline = newline or b("\n")
+        # Chunk fetched by readline(), returned up to _buffer_start.
         self._buffer = b("")
+        self._buffer_start = 0
         self._buffer_pos = 0
+        # Read-ahead buffer holding the file contents from _ra_off onwards,
+        # and a view of the data before it kept from the previous buffer.
+        self._ra_size = buffering if buffering > 1 else self.buffer_size
+        if buffering == 0:
+            self._ra_size = 0
+        self._ra_buf = b("")
+        self._ra_back = b("")
+        self._ra_off = 0
+        self._prefetch = None
+        # Bookkeeping of writes sent with async_writes.
+        self._async_writes = async_writes
+        self._inflight = 0
+        self._inflight_cond = threading.Condition()
+        self._write_error = None
+        # Writes collected for the file contents from _write_off onwards.
+        self._write_buffer_size = write_buffer_size
+        self._write_buf = bytearray()
+        self._write_off = 0
 
         # flag translation
-        self._flags = translate_file_mode_to_flags(mode)
+        self._flags = self._mode_bits.flags
 
         statmsg, response = self._file.open(path, flags=self._flags)
 
@@ -127,8 +245,13 @@ class XRootDPyFile(object):
                 self.path, statmsg, "instantiating file ({0})".format(path)
             )
 
+        # Opening with DELETE truncates the file, so its size is known
+        # without asking the server.
+        if self._flags & OpenFlags.DELETE:
+            self._size = 0
+
         # Deal with the modes
-        if "a" in self.mode:
+        if self._mode_bits.append:
             self.seek(self.size, Seek.set)
 
     def _raise_status(self, path, status, source=None):
@@ -147,18 +270,90 @@ class XRootDPyFile(object):
         self.close()
 
     def __iter__(self):
-        """Initialize the internal iterator."""
-        self._next_func = self.read
+        """Initialize the internal iterator.
+
+        Chunks of files opened for reading only are fetched with
+        ``PIPELINE_DEPTH`` read requests in flight.
+        """
+        # Unbound methods, so that the file does not refer to itself and is
+        # still closed by __del__ once it is no longer used.
+        self._next_func = type(self).read
         self._next_args = ([], dict(sizehint=self.buffer_size))
 
         if self.buffering == 1 or (self.buffering == -1 and "b" not in self.mode):
-            self._next_func = self.readline
+            self._next_func = type(self).readline
             self._next_args = ([], dict())
+            return self
         elif self.buffering > 1:
             self._next_args = ([], dict(sizehint=self.buffering))
 
+        if not self._mode_bits.writable:
+            self._iterator = self._pipelined_iter(**self._next_args[1])
+            self._next_func = type(self)._next_chunk
+            self._next_args = ([], dict())
+
         return self
 
+    def _next_chunk(self):
+        """Get the next chunk from the pipelined iterator.
+
+        The iterator is dropped once it is exhausted, as it refers back to
+        the file.
+        """
+        if self._iterator is None:
+            if self.closed:
+                raise ValueError("I/O operation on closed file.")
+            return b("")
+        chunk = next(self._iterator, b(""))
+        if not chunk:
+            self._iterator = None
+        return chunk
+
+    def _pipelined_iter(self, sizehint, depth=PIPELINE_DEPTH):
+        """Yield the file in chunks of ``sizehint`` bytes from the current position.
+
+        Chunks smaller than ``buffer_size`` are fetched several at a time,
+        and up to ``depth`` read requests are sent ahead of the chunk being
+        consumed. Seeking while iterating discards the requests in flight.
+        """
+        blocksize = sizehint * max(self.buffer_size // sizehint, 1)
+        pending = deque()
+        offset = self._ipp
+        while True:
+            if self.closed:
+                raise ValueError("I/O operation on closed file.")
+            self._assert_mode("r-")
+
+            if pending and pending[0].offset != self._ipp:
+                pending.clear()
+            if not pending:
+                offset = self._ipp
+
+            size = self.size
+            while len(pending) < depth and offset < size:
+                request = _PendingRead(offset)
+                statmsg = self._file.read(
+                    offset=offset, size=blocksize, callback=request
+                )
+                if not statmsg.ok:
+                    self._raise_status(self.path, statmsg, "reading")
+                pending.append(request)
+                offset += blocksize
+
+            if not pending:
+                return
+
+            statmsg, res = pending.popleft().wait()
+            if not statmsg.ok:
+                self._raise_status(self.path, statmsg, "reading")
+            for start in range(0, len(res), sizehint):
+                chunk = res[start : start + sizehint]
+                self._ipp = end = self._ipp + len(chunk)
+                yield chunk
+                if self._ipp != end:
+                    # Seeked; the rest of this block is stale.
+                    break
+
     def __enter__(self):
         """Enter context manager method."""
         return self
@@ -169,7 +364,7 @@ class XRootDPyFile(object):
 
     def __next__(self):
         """Return next item for file iteration for Python 3."""
-        item = self._next_func(*self._next_args[0], **self._next_args[1])
+        item = self._next_func(self, *self._next_args[0], **self._next_args[1])
         if not item:
             raise StopIteration
         return item
@@ -183,6 +378,8 @@ class XRootDPyFile(object):
 
         If no ``sizehint`` is provided the entire file is read! Multiple calls
         to this method after EOF as been reached, will return an empty string.
+        Reads larger than ``VECTOR_READ_THRESHOLD`` are sent as vector reads
+        split to the server's ``readv`` limits.
 
         :param sizehint: Number of bytes to read from file object.
         """
@@ -190,8 +387,11 @@ class XRootDPyFile(object):
             raise ValueError("I/O operation on closed file.")
 
         self._assert_mode("r-")
+        self._wait_for_writes()
 
-        chunksize = sizehint if sizehint > 0 else self.size - self._ipp
+        # Look up the size and position once; read() is called in tight loops.
+        size, ipp = self.size, self._ipp
+        chunksize = sizehint if sizehint > 0 else size - ipp
 
         if chunksize >= 2147483648:  # 2GB in bytes
             raise IOError(
@@ -201,71 +401,320 @@ class XRootDPyFile(object):
         elif chunksize < 0:
             chunksize = 1
 
-        # Read data
-        statmsg, res = self._file.read(
-            offset=self._ipp,
-            size=chunksize,
-        )
+        if 0 < sizehint < self._ra_size:
+            res = self._read_ahead(sizehint)
+        elif chunksize > VECTOR_READ_THRESHOLD:
+            res = self._vector_read([(ipp, chunksize)])[0]
+        else:
+            # Read data
+            statmsg, res = self._file.read(
+                offset=ipp,
+                size=chunksize,
+            )
 
-        if not statmsg.ok:
-            self._raise_status(self.path, statmsg, "reading")
+            if not statmsg.ok:
+                self._raise_status(self.path, statmsg, "reading")
 
         # Increment internal file pointer.
-        self._ipp = min(
-            self._ipp + chunksize, self.size if self.size > self._ipp else self._ipp
-        )
+        self._ipp = min(ipp + chunksize, max(size, ipp))
 
         return res
 
+    def readinto(self, buf):
+        """Read up to ``len(buf)`` bytes into the writable buffer ``buf``.
+
+        Small reads are served from the read-ahead buffer like ``read()``.
+
+        :param buf: A writable bytes-like object, e.g. a ``bytearray``.
+        :returns: Number of bytes read, 0 at the end of the file.
+        """
+        with memoryview(buf) as raw, raw.cast("B") as view:
+            if not len(view):
+                return 0
+            data = self.read(len(view))
+            n = len(data)
+            view[:n] = data
+        return n
+
+    def _read_ahead(self, size):
+        """Serve a small read from the read-ahead buffer.
+
+        On a miss, ``_ra_size`` bytes are fetched and kept for the following
+        reads. If the read starts inside the buffer, or less than
+        ``READ_AHEAD_FORWARD`` bytes after it, the next block is fetched from
+        its end, and up to ``READ_AHEAD_BACKWARD`` bytes of the old buffer
+        before the read position are kept, so seeking back a little stays
+        cheap.
+
+        Once the buffer is extended forward, i.e. the file is read
+        sequentially, the next ``_ra_size`` bytes are requested in the
+        background, so the following refill does not wait a full round trip.
+        """
+        start = self._ipp - self._ra_off
+        end = start + size
+        buf = self._ra_buf
+        if -len(self._ra_back) <= start <= len(buf) and (
+            end <= len(buf) or self._ra_off + len(buf) >= self.size
+        ):
+            return self._ra_slice(start, end)
+
+        fetch = self._ra_size
+        sequential = bool(buf) and 0 <= start <= len(buf) + READ_AHEAD_FORWARD
+        if sequential:
+            offset = self._ra_off + len(buf)
+            fetch += max(start - len(buf), 0)
+        else:
+            offset, buf, start = self._ipp, b(""), 0
+
+        prefetch, self._prefetch = self._prefetch, None
+        statmsg = None
+        if prefetch and prefetch.offset == offset and fetch == self._ra_size:
+            statmsg, res = prefetch.wait()
+        if statmsg is None or not statmsg.ok:
+            statmsg, res = self._file.read(offset=offset, size=fetch)
+            if not statmsg.ok:
+                self._raise_status(self.path, statmsg, "reading")
+
+        # The old buffer is kept as a view, so refills copy no data.
+        self._ra_back = memoryview(buf)[max(start - READ_AHEAD_BACKWARD, 0) :]
+        self._ra_buf = res
+        self._ra_off = offset
+        if sequential:
+            self._prefetch_next()
+        start = self._ipp - offset
+        return self._ra_slice(start, start + size)
+
+    def _ra_slice(self, start, end):
+        """Get the read-ahead data from ``start`` to ``end``.
+
+        Offsets are relative to ``_ra_off``; negative ones refer to the data
+        kept before the read-ahead buffer.
+        """
+        if start >= 0:
+            return self._ra_buf[start:end]
+        back = self._ra_back
+        n = len(back)
+        if end <= 0:
+            return bytes(back[n + start : n + end])
+        return bytes(back[n + start :]) + self._ra_buf[:end]
+
+    def _prefetch_next(self):
+        """Request the ``_ra_size`` bytes after the read-ahead buffer."""
+        offset = self._ra_off + len(self._ra_buf)
+        if offset < self.size:
+            request = _PendingRead(offset)
+            statmsg = self._file.read(
+                offset=offset, size=self._ra_size, callback=request
+            )
+            if statmsg.ok:
+                self._prefetch = request
+
+    def _invalidate_read_ahead(self):
+        """Drop the read-ahead buffer, e.g. after the file was modified."""
+        self._ra_buf = b("")
+        self._ra_back = b("")
+        self._ra_off = 0
+        self._prefetch = None
+
+    def readv(self, ranges):
+        """Read several byte ranges with as few requests as possible.
+
+        The ranges are sent to the server as vector reads (``kXR_readv``)
+        within the limits reported by the server, instead of one request per
+        range. Ranges are clipped at the end of the file. The internal file
+        pointer is not moved.
+
+        :param ranges: Iterable of ``(offset, size)`` tuples.
+        :returns: List of bytes, one item per range.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+
+        self._assert_mode("r")
+        self._wait_for_writes()
+        return self._vector_read(ranges)
+
+    def _vector_read(self, ranges):
+        """Read byte ranges with vector reads within the server's limits."""
+        # Split each range into chunks the server accepts.
+        iov_max, ior_max = _get_server_limits(self.path)
+        ranges = list(ranges)
+        results = [[] for _ in ranges]
+        size = self.size
+        chunks, owners = [], []
+        for i, (offset, length) in enumerate(ranges):
+            end = min(offset + length, size)
+            while offset < end:
+                n = min(end - offset, ior_max)
+                chunks.append((offset, n))
+                owners.append(i)
+                offset += n
+
+        for start in range(0, len(chunks), iov_max):
+            statmsg, res = self._file.vector_read(
+                chunks=chunks[start : start + iov_max]
+            )
+            if not statmsg.ok:
+                self._raise_status(self.path, statmsg, "reading")
+            for owner, chunk in zip(owners[start:], res.chunks):
+                results[owner].append(chunk.buffer)
+
+        return [b("").join(bits) for bits in results]
+
+    def digest(self, algorithm="sha256"):
+        """Compute a digest of the file's entire contents.
+
+        The file is read in chunks of ``DIGEST_CHUNK_SIZE`` bytes. The
+        internal file pointer is not moved.
+
+        :param algorithm: Name of a :mod:`hashlib` algorithm.
+        :returns: The digest as bytes.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+
+        self._assert_mode("r")
+        self._wait_for_writes()
+
+        hashobj = hashlib.new(algorithm)
+        for offset in range(0, self.size, DIGEST_CHUNK_SIZE):
+            statmsg, res = self._file.read(offset=offset, size=DIGEST_CHUNK_SIZE)
+            if not statmsg.ok:
+                self._raise_status(self.path, statmsg, "reading")
+            hashobj.update(res)
+        return hashobj.digest()
+
     def readline(self):
         """Read one entire line from the file.
 
         A trailing newline character is kept in the string (but may be absent
         when a file ends with an incomplete line).
-        """
-        bits = [self._buffer if self._buffer_pos == self.tell() else b("")]
-        indx = bits[-1].find(self._newline)
-
-        if indx == -1:
-            # Read chunks until first newline is found or entire file is read.
-            while indx == -1:
-                bit = self.read(self.buffer_size)
-                bits.append(bit)
-                if not bit:
-                    break
-                indx = bit.find(self._newline)
-
-        if indx == -1:
-            return b("").join(bits)
 
-        indx += len(self._newline)
-        extra = bits[-1][indx:]
-        bits[-1] = bits[-1][:indx]
-
-        self._buffer = extra
+        Lines are cut from chunks of ``buffer_size`` bytes. The rest of a
+        chunk is kept and consumed by the following calls without copying it.
+        """
+        newline = self._newline
+        if self._buffer_pos == self.tell():
+            buf, start = self._buffer, self._buffer_start
+            indx = buf.find(newline, start)
+            if indx != -1:
+                self._buffer_start = indx + len(newline)
+                return buf[start : self._buffer_start]
+            bits = [buf[start:]]
+        else:
+            bits = []
+
+        # Read chunks until first newline is found or entire file is read.
+        indx = -1
+        while indx == -1:
+            bit = self.read(self.buffer_size)
+            if not bit:
+                self._buffer, self._buffer_start = b(""), 0
+                return b("").join(bits)
+            bits.append(bit)
+            indx = bit.find(newline)
+
+        indx += len(newline)
+        self._buffer, self._buffer_start = bit, indx
         self._buffer_pos = self.tell()
-
+        bits[-1] = bit[:indx]
         return b("").join(bits)
 
+    def _take_buffer(self):
+        """Drop and return the data fetched by readline() but not returned."""
+        rest = b("")
+        if self._buffer_pos == self.tell():
+            rest = self._buffer[self._buffer_start :]
+        self._buffer, self._buffer_start = b(""), 0
+        return rest
+
     def readlines(self):
-        """Read until EOF using readline().
+        """Read until EOF and return a list of lines.
+
+        The rest of the file is fetched with a single read request and split
+        in memory. Files with more than ``MAX_BULK_READ`` bytes left are read
+        in chunks of ``BULK_CHUNK_SIZE`` instead, the next chunk being fetched
+        while the current one is split.
 
         .. warning::
            This methods reads the entire file into memory! You are probably
            better off using either ``xreadlines`` or just normal iteration
            over the file object.
         """
-        return list(self.xreadlines())
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        self._assert_mode("r-")
+
+        rest = self._take_buffer()
+
+        lines, rest = self._splitlines(rest)
+        remaining = self.size - self.tell()
+        if remaining <= 0:
+            chunks = []
+        elif remaining <= MAX_BULK_READ:
+            chunks = [self.read(remaining)]
+        else:
+            self._wait_for_writes()
+            chunks = self._pipelined_iter(BULK_CHUNK_SIZE, depth=2)
+        for bit in chunks:
+            more, rest = self._splitlines(rest + bit)
+            lines.extend(more)
+
+        if rest:
+            lines.append(rest)
+        return lines
+
+    def _splitlines(self, data):
+        """Split data into complete lines, keeping newlines, and the rest."""
+        newline = self._newline
+        if newline == b("\n"):
+            # BytesIO scans for newlines in C and keeps them on the lines.
+            lines = io.BytesIO(data).readlines()
+            if lines and not lines[-1].endswith(newline):
+                return lines, lines.pop()
+            return lines, b("")
+        parts = data.split(newline)
+        rest = parts.pop()
+        return [part + newline for part in parts], rest
 
     def xreadlines(self, sizehint=-1):
-        """Get an iterator over number of lines."""
-        line = True
+        """Get an iterator over number of lines.
 
-        while line:
-            line = self.readline()
-            if not line:
-                break
-            yield line
+        For ``\\n`` line endings the lines are split by an
+        :class:`io.BufferedReader` reading chunks of at least
+        ``LINES_CHUNK_SIZE`` bytes from the current position; other line
+        endings fall back to ``readline()``. Seeking while iterating
+        continues from the new position.
+        """
+        if self._newline != b("\n"):
+            line = True
+            while line:
+                line = self.readline()
+                if not line:
+                    break
+                yield line
+            return
+
+        buffer_size = max(self.buffer_size, self.buffering, LINES_CHUNK_SIZE)
+        while True:
+            # Start from the logical position, i.e. before any data that
+            # readline() has fetched but not returned yet.
+            self._ipp -= len(self._take_buffer())
+
+            # The reader fetches ahead of the lines it returns. Keep the
+            # position pointer after the last line yielded, so the file can
+            # still be used once the caller stops iterating early, and start
+            # over if the caller moved it while iterating.
+            pos = self._ipp
+            reader = io.BufferedReader(_XRootDRawIO(self, pos), buffer_size)
+            for line in reader:
+                pos += len(line)
+                self._ipp = pos
+                yield line
+                if self._ipp != pos:
+                    break
+            else:
+                return
 
     def write(self, data, flushing=False):
         """Write the given string to the file.
@@ -276,7 +725,7 @@ class XRootDPyFile(object):
         """
         self._assert_mode("w-")
 
-        if "a" in self.mode:
+        if self._mode_bits.append:
             self.seek(0, Seek.end)
 
         if not isinstance(data, binary_type):
@@ -285,20 +734,110 @@ class XRootDPyFile(object):
             elif isinstance(data, text_type):
                 data = data.encode(self.encoding, self.errors)
 
-        statmsg, res = self._file.write(data, offset=self._ipp)
+        # Empty writes change nothing, don't send them to the server.
+        if not data:
+            if flushing:
+                self.flush()
+            return
 
-        if not statmsg.ok:
-            self._raise_status(self.path, statmsg, "writing")
+        self._invalidate_read_ahead()
+        if self._write_buffer_size > 0:
+            self._buffer_write(data)
+        else:
+            self._send_write(data, self._ipp)
 
         self._ipp += len(data)
         self._size = max(self.size, self.tell())
         if flushing:
             self.flush()
 
+    def _buffer_write(self, data):
+        """Add data written at the current position to the write buffer."""
+        buf = self._write_buf
+        if buf and self._write_off + len(buf) != self._ipp:
+            self._flush_write_buffer()
+        if not buf:
+            self._write_off = self._ipp
+        buf += data
+        if len(buf) >= self._write_buffer_size:
+            self._flush_write_buffer()
+
+    def _flush_write_buffer(self):
+        """Send the contents of the write buffer to the server."""
+        data = bytes(self._write_buf)
+        del self._write_buf[:]
+        self._send_write(data, self._write_off)
+
+    def _send_write(self, data, offset):
+        """Write data at offset, without waiting if ``async_writes`` is set."""
+        if self._async_writes:
+            self._write_async(data, offset)
+            return
+
+        statmsg, res = self._file.write(data, offset=offset)
+        if not statmsg.ok:
+            self._raise_status(self.path, statmsg, "writing")
+
+    def _write_async(self, data, offset):
+        """Send a write request without waiting for the response."""
+        with self._inflight_cond:
+            self._inflight += 1
+
+        statmsg = self._file.write(data, offset=offset, callback=self._write_done)
+        if not statmsg.ok:
+            self._write_done(statmsg, None, None)
+            self._wait_for_writes()
+
+    def _write_done(self, status, response, hostlist):
+        """Record the response to a write sent by ``_write_async()``."""
+        with self._inflight_cond:
+            self._inflight -= 1
+            if not status.ok and self._write_error is None:
+                self._write_error = status
+            self._inflight_cond.notify_all()
+
+    def _wait_for_writes(self):
+        """Wait for outstanding writes and raise the first failure, if any.
+
+        Buffered writes are sent first.
+        """
+        if self._write_buf:
+            self._flush_write_buffer()
+        if not self._async_writes:
+            return
+        with self._inflight_cond:
+            self._inflight_cond.wait_for(lambda: not self._inflight)
+            error, self._write_error = self._write_error, None
+        if error is not None:
+            self._raise_status(self.path, error, "writing")
+
     def writelines(self, sequence):
-        """Write an sequence of lines to file."""
+        """Write an sequence of lines to file.
+
+        The lines are joined and sent with one write request per
+        ``WRITELINES_BLOCK_SIZE`` bytes instead of one request per line.
+        Lists and tuples of up to that size are joined in a single step.
+        """
+        if isinstance(sequence, (list, tuple)):
+            sequence = [
+                s.encode(self.encoding, self.errors) if isinstance(s, text_type) else s
+                for s in sequence
+            ]
+            if sum(map(len, sequence)) <= WRITELINES_BLOCK_SIZE:
+                self.write(b("").join(sequence))
+                return
+
+        parts, n = [], 0
         for s in sequence:
-            self.write(s)
+            if isinstance(s, text_type):
+                s = s.encode(self.encoding, self.errors)
+            parts.append(s)
+            n += len(s)
+            if n >= WRITELINES_BLOCK_SIZE:
+                self.write(b("").join(parts))
+                parts, n = [], 0
+        if parts:
+            self.write(b("").join(parts))
 
     def seek(self, offset, whence=Seek.set):
         """Set the file's internal position pointer, approximately.
@@ -313,8 +852,11 @@ class XRootDPyFile(object):
             The ipp is set to its current position plus offset bytes.
         ``Seek.end``
             The ipp is set to the size of the file plus offset bytes.
+
+        Seeking does not drop the read-ahead buffer; reads after a seek into
+        it, including a short way backwards, are served from memory.
         """
-        if "-" in self.mode:
+        if not self._mode_bits.seekable:
             raise IOError("File is not seekable.")
 
         # Convert to integer by rounding down/omitting everything after
@@ -334,6 +876,7 @@ class XRootDPyFile(object):
             self._ipp = self.size + offset
         else:
             raise NotImplementedError(whence)
+        self._buffer, self._buffer_start = b(""), 0
 
     def tell(self):
         """Get the location of the file's internal position pointer."""
@@ -344,12 +887,21 @@ class XRootDPyFile(object):
 
         Note that ``size`` will never be None; if it was not specified by the
         user the current file position is used.
+
+        The file is truncated (or extended with zeros) by the server in a
+        single request; no data is transferred when growing a file. Nothing
+        is sent if the file already has the given size.
         """
         self._assert_mode("w")
 
         if size is None:
             size = self.tell()
 
+        if size == self._size:
+            return
+
+        self._wait_for_writes()
+        self._invalidate_read_ahead()
         statmsg = self._file.truncate(size)[0]
 
         if not statmsg.ok:
@@ -357,35 +909,71 @@ class XRootDPyFile(object):
 
         self._size = size
 
-    def close(self):
+    def close(self, sync=True):
         """Close the file, including flushing the write buffers.
 
         The file may not be accessed further once it is closed.
+
+        :param sync: Wait for the server to confirm the close (default). With
+            ``sync=False`` the close request is sent in the background and
+            errors reported by the server are ignored; use
+            :func:`wait_for_pending_closes` to wait for outstanding closes.
         """
-        if not self.closed:
-            statmsg = self._file.close()[0]
+        self._iterator = None
+        if self.closed:
+            return
 
-            if not statmsg.ok:
-                self._raise_status(self.path, statmsg, "closing")
+        self._wait_for_writes()
+        if not sync:
+            self._close_async()
+            return
+
+        statmsg = self._file.close()[0]
+
+        if not statmsg.ok:
+            self._raise_status(self.path, statmsg, "closing")
+
+    def _close_async(self):
+        """Send the close request without waiting for the response."""
+        global _wait_at_exit
+        xrdfile = self._file
+
+        def done(status, response, hostlist):
+            with _pending_closes_cond:
+                _pending_closes.discard(xrdfile)
+                _pending_closes_cond.notify_all()
+
+        with _pending_closes_cond:
+            if not _wait_at_exit:
+                atexit.register(wait_for_pending_closes, 30)
+                _wait_at_exit = True
+            _pending_closes.add(xrdfile)
+
+        statmsg = xrdfile.close(callback=done)
+        if not statmsg.ok:
+            done(statmsg, None, None)
+            self._raise_status(self.path, statmsg, "closing")
+        self._closing = True
 
     def flush(self):
         """Flush write buffers."""
         if not self.closed:
+            self._wait_for_writes()
             statmsg, dummy = self._file.sync()
             if not statmsg.ok:
                 self._raise_status(self.path, statmsg, "flushing write buffer")
 
     def seekable(self):
         """Check if file is seekable."""
-        return "-" not in self.mode
+        return self._mode_bits.seekable
 
     def readable(self):
         """Check if file is readable."""
-        return "r" in self.mode or "+" in self.mode
+        return self._mode_bits.readable
 
     def writable(self):
         """Check if file is writable."""
-        return "w" in self.mode or "+" in self.mode or "a" in self.mode
+        return self._mode_bits.writable
 
     def isatty(self):
         """Check if file is a TTY (false always).
@@ -409,7 +997,7 @@ class XRootDPyFile(object):
     @property
     def closed(self):
         """Check if file is closed."""
-        return not self._file.is_open()
+        return self._closing or not self._file.is_open()
 
     @property
     def size(self):
@@ -432,14 +1020,107 @@ class XRootDPyFile(object):
                     "was it deleted? "
                     "Close and re-open the file."
                 )
-        if "+" in mstr:
-            return True
-        if "-" in mstr and "-" not in mode:
+        missing = _mode_bits(mode).needs & ~_mode_bits(mstr).caps
+        if missing & _CAN_SEEK:
             raise IOError("File does not support seeking.")
-        if "r" in mode:
-            if "r" not in mstr:
-                raise IOError("File not opened for reading")
-        if "w" in mode:
-            if "w" not in mstr and "a" not in mstr:
-                raise IOError("File not opened for writing")
+        if missing & _CAN_READ:
+            raise IOError("File not opened for reading")
+        if missing:
+            raise IOError("File not opened for writing")
+        return True
+
+
+#: Vector read limits ``(readv_iov_max, readv_ior_max)`` per endpoint.
+_server_limits = {}
+_server_limits_lock = threading.Lock()
+
+
+def _get_server_limits(url):
+    """Get the vector read limits of the server ``url`` points to.
+
+    The server is queried once per endpoint. ``READV_IOV_MAX`` and
+    ``READV_IOR_MAX`` are used if it does not report the limits.
+    """
+    root_url = spliturl(url)[0]
+    with _server_limits_lock:
+        limits = _server_limits.get(root_url)
+    if limits is not None:
+        return limits
+
+    limits = (READV_IOV_MAX, READV_IOR_MAX)
+    status, res = FileSystem(root_url).query(
+        QueryCode.CONFIG, "readv_iov_max readv_ior_max"
+    )
+    if status.ok:
+        # Unknown parameters are echoed back by name instead of a value, and
+        # anything after a null byte is padding (see XRootDPyFS._query).
+        values = res.split(b"\x00")[0].split()
+        if len(values) == 2 and all(v.isdigit() for v in values):
+            limits = tuple(int(v) for v in values)
+
+    with _server_limits_lock:
+        _server_limits[root_url] = limits
+    return limits
+
+
+#: Files closed with ``close(sync=False)`` which the server has not
+#: confirmed yet.
+_pending_closes = set()
+_pending_closes_cond = threading.Condition()
+
+#: Whether ``wait_for_pending_closes()`` is registered to run at exit, which
+#: is done on the first ``close(sync=False)``.
+_wait_at_exit = False
+
+
+def wait_for_pending_closes(timeout=None):
+    """Wait until all closes issued with ``close(sync=False)`` are done.
+
+    :param timeout: Maximum number of seconds to wait, or None to wait until
+        all closes are done.
+    :returns: True if no closes are pending anymore.
+    """
+    with _pending_closes_cond:
+        return _pending_closes_cond.wait_for(lambda: not _pending_closes, timeout)
+
+
+class _PendingRead(object):
+    """Callback collecting the response of an asynchronous read."""
+
+    def __init__(self, offset):
+        self.offset = offset
+        self._done = threading.Event()
+        self._result = None
+
+    def __call__(self, status, response, hostlist):
+        self._result = (status, response)
+        self._done.set()
+
+    def wait(self):
+        """Wait for the response and return ``(status, data)``."""
+        self._done.wait()
+        return self._result
+
+
+class _XRootDRawIO(io.RawIOBase):
+    """Unbuffered reader over an ``XRootDPyFile`` for use with ``io`` classes.
+
+    Reads start at ``offset`` and continue from where the previous read
+    stopped, independently of the file's internal position pointer.
+    """
+
+    def __init__(self, xfile, offset):
+        super(_XRootDRawIO, self).__init__()
+        self._xfile = xfile
+        self._offset = offset
+
+    def readable(self):
+        """Check if the stream is readable."""
         return True
+
+    def readinto(self, buf):
+        """Read up to ``len(buf)`` bytes into ``buf``."""
+        self._xfile._ipp = self._offset
+        n = self._xfile.readinto(buf)
+        self._offset += n
+        return n